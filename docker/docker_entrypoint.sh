@@ -1,8 +1,10 @@
 cd /home/votingapp;
-python3 manage.py flush --no-input;
-python3 /home/votingapp/manage.py migrate auth;
-python3 /home/votingapp/manage.py migrate;
-python3 manage.py makemigrations voting;
-python3 manage.py migrate voting;
-python3 /home/votingapp/manage.py createsuperuser --no-input --username votingapp --email votingapp@gmail.com;
-python3 manage.py runserver 0.0.0.0:8000;
\ No newline at end of file
+# Applies pending migrations and creates the superuser if it doesn't exist yet.
+python3 manage.py bootstrap;
+# Renders the API schema unless it is current, so the workers don't.
+python3 manage.py build_schema;
+# Set VOTINGAPP_SERVER=runserver for the autoreloading development server.
+if [ "$VOTINGAPP_SERVER" = "runserver" ]; then
+    exec python3 manage.py runserver 0.0.0.0:8000;
+fi
+exec gunicorn;
\ No newline at end of file
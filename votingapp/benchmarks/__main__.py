@@ -0,0 +1,174 @@
+"""
+Runs the load-test scenarios against a seeded synthetic dataset and reports
+latency percentiles, throughput and SQL queries per request for each endpoint.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --compare results.json --threshold 0.2
+
+Uses the configured database (set VOTINGAPP_DATABASE=sqlite for SQLite) with a
+throwaway test database. With --compare, exits with status 1 when an endpoint
+got slower at p95 or needs more queries than in the baseline.
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.generator import Dataset
+from benchmarks.scenarios import SCENARIOS, Recorder, run_scenario
+from benchmarks.utils import benchmark_database, setup_django
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = round(p / 100 * (len(values) - 1))
+    return values[index]
+
+
+def summarize(recorder, label, elapsed):
+    seconds = [sample[0] for sample in recorder.samples[label]]
+    queries = [sample[1] for sample in recorder.samples[label]]
+    return {
+        "requests": len(seconds),
+        "statuses": {str(k): v for k, v in sorted(recorder.statuses[label].items())},
+        "throughput_rps": round(len(seconds) / elapsed, 1),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Prints the differences to the baseline and returns the regressed endpoints."""
+    regressions = []
+    for label, current in results["endpoints"].items():
+        previous = baseline["endpoints"].get(label)
+        if previous is None:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0
+        print(
+            f"{label:40} p95 {previous['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms "
+            f"({change:+.0%}), queries {previous['queries_per_request']} -> "
+            f"{current['queries_per_request']}"
+        )
+        if (
+            change > threshold
+            # Rejected votes need fewer queries, allow for a different mix.
+            or current["queries_per_request"] > previous["queries_per_request"] + 0.5
+        ):
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    parser.add_argument("--users", type=int, default=Dataset.users)
+    parser.add_argument("--restaurants", type=int, default=Dataset.restaurants)
+    parser.add_argument("--days", type=int, default=Dataset.days)
+    parser.add_argument("--limit", type=int, default=Dataset.limit)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Scenario to run, can be repeated. Runs all by default.",
+    )
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per thread and scenario"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative p95 increase over the baseline",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    # Rejected votes are expected, don't log every 429.
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from voting.models import ApiKey
+
+    dataset = Dataset(
+        seed=args.seed,
+        users=args.users,
+        restaurants=args.restaurants,
+        days=args.days,
+        limit=args.limit,
+    )
+    results = {
+        "meta": {
+            "dataset": dataset.as_dict(),
+            "threads": args.threads,
+            "requests_per_thread": args.requests,
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "revision": git_revision(),
+        },
+        "endpoints": {},
+    }
+
+    with benchmark_database():
+        started = time.perf_counter()
+        dataset.load()
+        results["meta"]["load_seconds"] = round(time.perf_counter() - started, 2)
+
+        user = User.objects.create_superuser("benchmark")
+        _, key = ApiKey.objects.issue(user, "benchmark")
+        for name in args.scenario or SCENARIOS:
+            recorder = Recorder()
+            elapsed = run_scenario(
+                SCENARIOS[name],
+                dataset,
+                recorder,
+                args.threads,
+                args.requests,
+                authorization=f"Api-Key {key}",
+            )
+            for label in recorder.samples:
+                results["endpoints"][label] = summarize(recorder, label, elapsed)
+
+    for label, summary in results["endpoints"].items():
+        print(
+            f"{label:40} p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  "
+            f"p99 {summary['p99_ms']:8.2f} ms  {summary['throughput_rps']:8.1f} req/s  "
+            f"{summary['queries_per_request']:5.1f} queries"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Measures requests per second of the app served by Gunicorn (configured by
+gunicorn.conf.py) with a growing number of workers, on the seeded benchmark
+dataset. The load comes from separate client processes, each sending one
+request after another.
+
+    python -m benchmarks.app_server --workers 1 2 4 8 --clients 16 --seconds 10
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks.generator import Dataset
+from benchmarks.utils import benchmark_database, setup_django
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def get(port, path, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def send_requests(port, path, headers, seconds):
+    """Returns (latencies of the 200 responses, number of other responses)."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while (started := time.perf_counter()) < deadline:
+        if get(port, path, headers) == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+@contextmanager
+def app_server(port, workers, env):
+    env = {
+        **os.environ,
+        **env,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_ACCESS_LOG": os.devnull,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--log-level", "warning"],
+        cwd=PROJECT_DIR,
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+            try:
+                if get(port, "/readyz", {}) == 200:
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+            time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def database_env(connection):
+    name = str(connection.settings_dict["NAME"])
+    if connection.vendor == "sqlite":
+        return {"VOTINGAPP_DATABASE": "sqlite", "VOTINGAPP_SQLITE_NAME": name}
+    return {"POSTGRES_NAME": name}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    parser.add_argument("--users", type=int, default=Dataset.users)
+    parser.add_argument("--restaurants", type=int, default=Dataset.restaurants)
+    parser.add_argument("--days", type=int, default=Dataset.days)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--path", default="/restaurants/winners")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+
+    from voting.models import ApiKey
+
+    dataset = Dataset(
+        seed=args.seed, users=args.users, restaurants=args.restaurants, days=args.days
+    )
+    with benchmark_database() as connection:
+        dataset.load()
+        user = User.objects.create_superuser("benchmark")
+        _, key = ApiKey.objects.issue(user, "benchmark")
+        headers = {"Authorization": f"Api-Key {key}"}
+        env = database_env(connection)
+        connection.close()
+
+        print(
+            f"database: {connection.vendor}, cpus: {os.cpu_count()}, "
+            f"clients: {args.clients}, path: {args.path}"
+        )
+        baseline = None
+        context = multiprocessing.get_context("spawn")
+        for workers in args.workers:
+            with app_server(args.port, workers, env):
+                with ProcessPoolExecutor(args.clients, mp_context=context) as pool:
+                    started = time.perf_counter()
+                    futures = [
+                        pool.submit(
+                            send_requests, args.port, args.path, headers, args.seconds
+                        )
+                        for _ in range(args.clients)
+                    ]
+                    results = [future.result() for future in futures]
+                    elapsed = time.perf_counter() - started
+            latencies = sorted(sample for samples, _ in results for sample in samples)
+            errors = sum(error for _, error in results)
+            rate = len(latencies) / elapsed
+            baseline = baseline or rate
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+            print(
+                f"{workers:>3} workers: {rate:8.1f} requests/s ({rate / baseline:4.2f}x), "
+                f"p50 {statistics.median(latencies or [0]) * 1000:6.1f} ms, "
+                f"p95 {p95 * 1000:6.1f} ms, errors {errors}"
+            )
+
+
+if __name__ == "__main__":
+    main()
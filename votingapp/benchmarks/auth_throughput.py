@@ -0,0 +1,50 @@
+"""
+Measures single-threaded requests per second of an authenticated endpoint with
+HTTP Basic authentication and with API keys.
+
+    python -m benchmarks.auth_throughput --requests 50
+"""
+import argparse
+import base64
+import time
+
+from benchmarks.utils import benchmark_database, setup_django
+
+
+def measure(client, path, authorization, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, HTTP_AUTHORIZATION=authorization)
+        assert response.status_code == 200, response.status_code
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--path", default="/restaurants")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    from voting.models import ApiKey
+
+    with benchmark_database():
+        password = "benchmark-password"
+        user = User.objects.create_superuser("benchmark", password=password)
+        _, key = ApiKey.objects.issue(user, "benchmark")
+        basic = base64.b64encode(f"benchmark:{password}".encode()).decode()
+
+        client = Client()
+        for name, authorization in (
+            ("basic", f"Basic {basic}"),
+            ("api-key", f"Api-Key {key}"),
+        ):
+            rate = measure(client, args.path, authorization, args.requests)
+            print(f"{name:>7}: {rate:8.1f} requests/s on one core")
+
+
+if __name__ == "__main__":
+    main()
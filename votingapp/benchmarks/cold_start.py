@@ -0,0 +1,114 @@
+"""
+Measures how long a container start takes until the first API request is
+answered: the database preparation of the previous entrypoint against
+manage.py bootstrap, and Gunicorn's start with and without the API docs, on an
+already migrated database.
+
+    python -m benchmarks.cold_start --repeat 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.app_server import PROJECT_DIR, database_env, get
+from benchmarks.utils import benchmark_database, setup_django
+
+# What docker_entrypoint.sh used to run before starting the server.
+LEGACY_BOOT = [
+    ["flush", "--no-input"],
+    ["migrate", "auth"],
+    ["migrate"],
+    ["makemigrations", "voting"],
+    ["migrate", "voting"],
+    [
+        "createsuperuser",
+        "--no-input",
+        "--username",
+        "votingapp",
+        "--email",
+        "votingapp@gmail.com",
+    ],
+]
+
+
+def run_commands(commands, env):
+    started = time.perf_counter()
+    for command in commands:
+        subprocess.run(
+            [sys.executable, "manage.py", *command],
+            cwd=PROJECT_DIR,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    return time.perf_counter() - started
+
+
+def first_request(env, port, path, headers):
+    """Starts Gunicorn and returns the seconds until path answers 200."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--log-level", "warning"],
+        cwd=PROJECT_DIR,
+        env={
+            **env,
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+            "GUNICORN_WORKERS": "1",
+            "GUNICORN_ACCESS_LOG": os.devnull,
+        },
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+            try:
+                if get(port, path, headers) == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--path", default="/restaurants")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+
+    from voting.models import ApiKey
+
+    with benchmark_database() as connection:
+        env = {
+            **os.environ,
+            **database_env(connection),
+            "DJANGO_SUPERUSER_PASSWORD": "benchmark-password",
+        }
+        connection.close()
+        boot = {"legacy entrypoint": LEGACY_BOOT, "bootstrap": [["bootstrap"]]}
+        for name, commands in boot.items():
+            best = min(run_commands(commands, env) for _ in range(args.repeat))
+            print(f"{name:>30}: {best:6.2f} s")
+
+        _, key = ApiKey.objects.issue(User.objects.get(username="votingapp"), "cold")
+        headers = {"Authorization": f"Api-Key {key}"}
+        connection.close()
+        for docs in ("1", "0"):
+            server_env = {**env, "VOTINGAPP_DOCS": docs}
+            best = min(
+                first_request(server_env, args.port, args.path, headers)
+                for _ in range(args.repeat)
+            )
+            label = f"first request, docs {'on' if docs == '1' else 'off'}"
+            print(f"{label:>30}: {best:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Seeded synthetic data: voting users, restaurants and votes over many days.
+
+The data is written to CSV files and loaded with the import_votes command, so
+large datasets go through COPY on PostgreSQL and get consistent weights, daily
+quotas and tallies on every database.
+"""
+import csv
+import io
+import itertools
+import os
+import random
+import tempfile
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+
+
+@dataclass
+class Dataset:
+    seed: int = 42
+    users: int = 1000
+    restaurants: int = 1000
+    days: int = 30
+    limit: int = 5
+    votes_per_user: float = 2.0
+    popularity_skew: float = 1.1
+
+    def as_dict(self):
+        return asdict(self)
+
+    def first_day(self):
+        return date.today() - timedelta(days=self.days - 1)
+
+    def write_files(self, directory):
+        """Writes users.csv, restaurants.csv and votes.csv; returns their paths."""
+        rng = random.Random(self.seed)
+        paths = {
+            name: os.path.join(directory, f"{name}.csv")
+            for name in ("users", "restaurants", "votes")
+        }
+
+        with open(paths["users"], "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["id", "username", "limit"])
+            writer.writerows(
+                (i, f"user-{i}", self.limit) for i in range(1, self.users + 1)
+            )
+
+        with open(paths["restaurants"], "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["id", "name"])
+            writer.writerows(
+                (i, f"Restaurant {i}") for i in range(1, self.restaurants + 1)
+            )
+
+        # A few restaurants get most of the votes, like in real life.
+        restaurant_ids = range(1, self.restaurants + 1)
+        cum_weights = list(
+            itertools.accumulate(
+                1 / rank**self.popularity_skew for rank in restaurant_ids
+            )
+        )
+        with open(paths["votes"], "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["restaurant_id", "voting_user_id", "date"])
+            for offset in range(self.days):
+                day = (self.first_day() + timedelta(days=offset)).isoformat()
+                for user_id in range(1, self.users + 1):
+                    count = min(
+                        self.limit, int(rng.expovariate(1 / self.votes_per_user))
+                    )
+                    for restaurant_id in rng.choices(
+                        restaurant_ids, cum_weights=cum_weights, k=count
+                    ):
+                        writer.writerow((restaurant_id, user_id, day))
+        return paths
+
+    def load(self, stdout=None):
+        """Generates the dataset into the current database."""
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = self.write_files(directory)
+            call_command(
+                "import_votes",
+                batch_size=50000,
+                stdout=stdout or io.StringIO(),
+                **paths,
+            )
@@ -0,0 +1,136 @@
+"""
+Scenario drivers. Each scenario runs in several threads, every thread with its
+own test client, and records the latency, status and SQL query count of every
+request under an endpoint label.
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+
+@contextmanager
+def count_queries():
+    from django.db import connection
+
+    executed = [0]
+
+    def counter(execute, sql, params, many, context):
+        executed[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        yield executed
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.elapsed = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def request(self, client, label, method, path, **kwargs):
+        with count_queries() as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            seconds = time.perf_counter() - started
+        with self._lock:
+            self.samples[label].append((seconds, queries[0]))
+            self.statuses[label][response.status_code] += 1
+        return response
+
+
+def vote_burst(client, rng, dataset, recorder, iterations):
+    for _ in range(iterations):
+        restaurant_id = rng.randint(1, dataset.restaurants)
+        recorder.request(
+            client,
+            "POST /restaurants/{id}/vote",
+            "post",
+            f"/restaurants/{restaurant_id}/vote",
+            data={"user_id": rng.randint(1, dataset.users)},
+            content_type="application/json",
+        )
+
+
+def winners_polling(client, rng, dataset, recorder, iterations):
+    first_day = dataset.first_day()
+    for i in range(iterations):
+        if i % 10:
+            recorder.request(
+                client, "GET /restaurants/winners", "get", "/restaurants/winners"
+            )
+        else:
+            day = first_day + timedelta(days=rng.randrange(dataset.days))
+            recorder.request(
+                client,
+                "GET /restaurants/winners?date=",
+                "get",
+                "/restaurants/winners",
+                data={"date": day.isoformat()},
+            )
+    recorder.request(
+        client,
+        "GET /restaurants/winners?from=&to=",
+        "get",
+        "/restaurants/winners",
+        data={"from": first_day.isoformat(), "to": date.today().isoformat()},
+    )
+
+
+def catalog_paging(client, rng, dataset, recorder, iterations):
+    pages = max(dataset.restaurants // 100, 1)
+    for _ in range(iterations // 2):
+        recorder.request(
+            client,
+            "GET /restaurants?page=",
+            "get",
+            "/restaurants",
+            data={"page": rng.randint(1, pages), "page_size": 100},
+        )
+
+    url = "/restaurants?pagination=cursor&page_size=100"
+    for _ in range(iterations - iterations // 2):
+        response = recorder.request(client, "GET /restaurants?cursor=", "get", url)
+        url = response.json()["next"] or "/restaurants?pagination=cursor&page_size=100"
+
+
+SCENARIOS = {
+    "vote_burst": vote_burst,
+    "winners_polling": winners_polling,
+    "catalog_paging": catalog_paging,
+}
+
+
+def run_scenario(scenario, dataset, recorder, threads, iterations, authorization):
+    """Runs `iterations` requests per thread and returns the wall-clock time."""
+    from django.db import connections
+    from django.test import Client
+
+    errors = []
+
+    def worker(index):
+        rng = random.Random(dataset.seed * 1000 + index)
+        client = Client(HTTP_AUTHORIZATION=authorization)
+        try:
+            scenario(client, rng, dataset, recorder, iterations)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return elapsed
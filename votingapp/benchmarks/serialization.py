@@ -0,0 +1,65 @@
+"""
+Measures the time to serialize and render 1000 restaurants and 1000 users the
+way list responses did (ModelSerializer and DRF's JSON renderer) against
+.values() rows rendered with orjson.
+
+    python -m benchmarks.serialization --repeat 20
+"""
+import argparse
+import time
+
+from benchmarks.utils import benchmark_database, setup_django
+
+ITEMS = 1000
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from voting.models import Restaurant, VotingUser
+    from voting.renderers import FastJSONRenderer
+    from voting.serializers import RestaurantSerializer, VotingUserSerializer
+
+    with benchmark_database():
+        Restaurant.objects.bulk_create(
+            Restaurant(name=f"Restaurant {i}") for i in range(ITEMS)
+        )
+        VotingUser.objects.bulk_create(
+            VotingUser(username=f"user{i}", limit=10) for i in range(ITEMS)
+        )
+        for serializer_class in (RestaurantSerializer, VotingUserSerializer):
+            queryset = serializer_class.Meta.model.objects.order_by("-pk")
+            fields = serializer_class.Meta.fields
+            variants = {
+                "serializer + json": lambda: JSONRenderer().render(
+                    serializer_class(queryset.all(), many=True).data
+                ),
+                "values + json": lambda: JSONRenderer().render(
+                    list(queryset.values(*fields))
+                ),
+                "values + orjson": lambda: FastJSONRenderer().render(
+                    list(queryset.values(*fields))
+                ),
+            }
+            name = serializer_class.Meta.model.__name__
+            for variant, function in variants.items():
+                seconds = best_of(args.repeat, function)
+                print(f"{name:>11} {variant:>18}: {seconds * 1000:7.2f} ms / {ITEMS}")
+
+
+if __name__ == "__main__":
+    main()
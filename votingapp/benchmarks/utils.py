@@ -0,0 +1,34 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "votingapp.settings")
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+
+    # Lets the test client talk to the app regardless of ALLOWED_HOSTS.
+    setup_test_environment()
+
+
+@contextmanager
+def benchmark_database():
+    """Creates a throwaway test database so benchmarks never touch real data."""
+    from django.db import connection
+
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    if connection.vendor == "sqlite" and not test_settings.get("NAME"):
+        # In-memory SQLite cannot be shared between benchmark threads.
+        test_settings["NAME"] = os.path.join(
+            tempfile.mkdtemp(), "votingapp_benchmark.sqlite3"
+        )
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
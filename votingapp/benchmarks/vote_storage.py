@@ -0,0 +1,87 @@
+"""
+Reports the on-disk size of the vote table and its indexes and how long it
+takes to aggregate all votes into per-day restaurant totals, on the seeded
+benchmark dataset.
+
+    python -m benchmarks.vote_storage --users 10000 --restaurants 2000 --days 90
+"""
+import argparse
+import time
+
+from benchmarks.generator import Dataset
+from benchmarks.utils import benchmark_database, setup_django
+
+
+def relation_sizes(connection, table):
+    """Returns (table bytes, {index name: bytes})."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("VACUUM ANALYZE " + connection.ops.quote_name(table))
+            # Partitioned tables and indexes are summed over their partitions.
+            cursor.execute(
+                "SELECT SUM(pg_relation_size(relid)) FROM pg_partition_tree(%s)",
+                [table],
+            )
+            table_size = cursor.fetchone()[0]
+            cursor.execute(
+                """
+                SELECT i.indexrelid::regclass::text, SUM(pg_relation_size(t.relid))
+                FROM pg_index i, pg_partition_tree(i.indexrelid) t
+                WHERE i.indrelid = %s::regclass
+                GROUP BY i.indexrelid
+                """,
+                [table],
+            )
+        else:
+            cursor.execute("VACUUM")
+            cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table])
+            table_size = cursor.fetchone()[0]
+            cursor.execute(
+                """
+                SELECT s.name, SUM(s.pgsize)
+                FROM dbstat s
+                JOIN sqlite_schema i ON i.name = s.name
+                WHERE i.type = 'index' AND i.tbl_name = %s
+                GROUP BY s.name
+                """,
+                [table],
+            )
+        index_sizes = dict(cursor.fetchall())
+    return table_size, index_sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    parser.add_argument("--users", type=int, default=Dataset.users)
+    parser.add_argument("--restaurants", type=int, default=Dataset.restaurants)
+    parser.add_argument("--days", type=int, default=Dataset.days)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from voting.models import DailyTally, Vote
+
+    dataset = Dataset(
+        seed=args.seed, users=args.users, restaurants=args.restaurants, days=args.days
+    )
+    with benchmark_database() as connection:
+        dataset.load()
+        print(f"database: {connection.vendor}, votes: {Vote.objects.count()}")
+
+        table_size, index_sizes = relation_sizes(connection, Vote._meta.db_table)
+        print(f"{'table':>40}: {table_size / 1024:10.0f} KiB")
+        for name, size in sorted(index_sizes.items()):
+            print(f"{name:>40}: {size / 1024:10.0f} KiB")
+        print(f"{'indexes total':>40}: {sum(index_sizes.values()) / 1024:10.0f} KiB")
+
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            list(DailyTally.objects.from_votes())
+            timings.append(time.perf_counter() - started)
+        print(f"{'aggregate all votes':>40}: {min(timings) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
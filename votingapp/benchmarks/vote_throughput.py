@@ -0,0 +1,135 @@
+"""
+Compares vote throughput of the original five-query vote path with the
+quota-claiming path under concurrent load.
+
+    python -m benchmarks.vote_throughput --threads 8 --users 50 --votes 20
+"""
+import argparse
+import threading
+import time
+from datetime import date
+
+from benchmarks.utils import benchmark_database, setup_django
+
+
+def legacy_vote(restaurant_id, voting_user_id, voting_date):
+    from django.db import IntegrityError
+
+    from voting.models import Restaurant, VotingUser
+
+    if not VotingUser.objects.filter(id=voting_user_id).exists():
+        return False
+    restaurant = Restaurant.objects.get(id=restaurant_id)
+    voting_user = VotingUser.objects.get(id=voting_user_id)
+    total_votes = voting_user.total_votes(voting_user, voting_date)
+    if total_votes >= voting_user.limit:
+        return False
+    try:
+        restaurant.votes.create(
+            voting_user=voting_user, ordinal=total_votes + 1, date=voting_date
+        )
+    except IntegrityError:
+        # another thread recorded the same vote of the quota
+        return False
+    return True
+
+
+def quota_vote(restaurant_id, voting_user_id, voting_date):
+    from voting.models import Vote, VoteLimitExceeded
+
+    try:
+        Vote.objects.cast(restaurant_id, voting_user_id, voting_date)
+    except VoteLimitExceeded:
+        return False
+    return True
+
+
+def run(vote, user_ids, restaurant_ids, votes_per_user, threads):
+    from django.db import connections
+
+    voting_date = date.today()
+    attempts = [
+        (restaurant_ids[i % len(restaurant_ids)], user_id)
+        for i in range(votes_per_user)
+        for user_id in user_ids
+    ]
+    errors = []
+
+    def worker(offset):
+        try:
+            for restaurant_id, user_id in attempts[offset::threads]:
+                vote(restaurant_id, user_id, voting_date)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return len(attempts) / elapsed
+
+
+def over_limit_votes():
+    from django.db.models import Count, F
+
+    from voting.models import Vote
+
+    per_user = (
+        Vote.objects.values("voting_user_id", "date")
+        .annotate(cast=Count("id"), limit=F("voting_user__limit"))
+        .order_by()
+    )
+    return sum(max(row["cast"] - row["limit"], 0) for row in per_user)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--restaurants", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument(
+        "--votes", type=int, default=10, help="vote attempts per user, above limit"
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from voting.models import DailyQuota, DailyTally, Restaurant, Vote, VotingUser
+
+    with benchmark_database() as connection:
+        print(f"database: {connection.vendor}, threads: {args.threads}")
+        for name, vote in (("legacy", legacy_vote), ("quota", quota_vote)):
+            Vote.objects.all().delete()
+            DailyQuota.objects.all().delete()
+            DailyTally.objects.all().delete()
+            VotingUser.objects.all().delete()
+            Restaurant.objects.all().delete()
+            user_ids = [
+                user.pk
+                for user in VotingUser.objects.bulk_create(
+                    VotingUser(username=f"{name}-{i}", limit=args.limit)
+                    for i in range(args.users)
+                )
+            ]
+            restaurant_ids = [
+                restaurant.pk
+                for restaurant in Restaurant.objects.bulk_create(
+                    Restaurant(name=f"{name}-{i}") for i in range(args.restaurants)
+                )
+            ]
+            rate = run(vote, user_ids, restaurant_ids, args.votes, args.threads)
+            print(
+                f"{name:>6}: {rate:8.1f} vote attempts/s, "
+                f"{over_limit_votes()} votes over the limit"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for serving votingapp in production. Gunicorn reads it
+from the working directory:
+
+    gunicorn                    # WSGI, votingapp.wsgi with sync workers
+    GUNICORN_ASGI=1 gunicorn    # ASGI, votingapp.asgi with uvicorn workers
+
+Send HUP to the master process to reload the code gracefully: new workers are
+started and the old ones finish their requests before they exit. Workers are
+recycled after GUNICORN_MAX_REQUESTS requests to bound memory growth.
+"""
+import multiprocessing
+import os
+
+# No django_extensions commands or browsable API in production.
+os.environ.setdefault("VOTINGAPP_DEV_TOOLS", "0")
+# The workers share invalidations of the cached winners and permissions and
+# which clients just wrote through a cache on the host.
+os.environ.setdefault("VOTINGAPP_CACHE", "file")
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = env_int("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = env_int("GUNICORN_THREADS", 1)
+
+if os.environ.get("GUNICORN_ASGI") == "1":
+    wsgi_app = "votingapp.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "votingapp.wsgi:application"
+    worker_class = "gthread" if threads > 1 else "sync"
+
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 10000)
+# Spreads the restarts so the workers are not all recycled at once.
+max_requests_jitter = max_requests // 10
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = 5
+
+# Every worker imports the app itself, so HUP picks up new code.
+preload_app = False
+# Worker heartbeats go to memory instead of the container's overlay disk.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def on_starting(server):
+    # The workers' shared counters start over with every server run, but not
+    # when a management command or a HUP reload starts another process.
+    os.environ["VOTING_SERVER_RUN"] = str(os.getpid())
@@ -0,0 +1,75 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached winners and permissions must not leak between tests.
+    cache.clear()
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def post_vote(client):
+    def post_vote(restaurant_id, user_id):
+        return client.post(
+            reverse("restaurant-vote", kwargs={"pk": restaurant_id}),
+            data={"user_id": user_id},
+            format="json",
+        )
+
+    return post_vote
+
+
+@pytest.fixture
+def vote(post_vote):
+    """Casts a vote that must be accepted."""
+
+    def vote(restaurant_id, user_id):
+        response = post_vote(restaurant_id, user_id)
+        assert status.is_success(response.status_code)
+        return response
+
+    return vote
+
+
+@pytest.fixture
+def api_user(db):
+    return User.objects.create_superuser(
+        "votingapp", "votingapp@votingapp.com", password="12345678"
+    )
+
+
+@pytest.fixture
+def setup_vote_tests(db, client, api_user):
+    client.force_authenticate(user=api_user)
+    voting_user_ids = []
+    for i in range(0, 3):
+        voting_user_response = client.post(
+            reverse("votinguser-list"),
+            {"username": f"test_username {i}", "limit": 5},
+            format="json",
+        )
+        assert status.is_success(voting_user_response.status_code)
+        voting_user_id = voting_user_response.data["id"]
+        voting_user_limit = voting_user_response.data["limit"]
+        assert voting_user_limit == 5
+        voting_user_ids.append(voting_user_id)
+
+    restaurant_ids = []
+    for i in range(0, 5):
+        restaurant_response = client.post(
+            reverse("restaurant-list"), {"name": f"Test restaurant {i}"}
+        )
+        assert status.is_success(restaurant_response.status_code)
+        restaurant_ids.append(restaurant_response.data["id"])
+
+    return voting_user_ids, restaurant_ids, voting_user_limit
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.authentication import verified_keys
+from voting.models import ApiKey
+
+
+@pytest.fixture
+def api_key(api_user):
+    verified_keys.clear()
+    out = io.StringIO()
+    call_command("api_keys", "issue", api_user.username, "--name", "kiosk", stdout=out)
+    return out.getvalue().splitlines()[-1]
+
+
+@pytest.mark.django_db
+def test_api_key_authenticates_without_queries_once_cached(client, api_key):
+    client.credentials(HTTP_AUTHORIZATION=f"Api-Key {api_key}")
+    response = client.get(reverse("restaurant-list"))
+    assert response.status_code == status.HTTP_200_OK
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("restaurant-list"))
+    assert response.status_code == status.HTTP_200_OK
+    assert not any("voting_apikey" in q["sql"] for q in queries.captured_queries)
+    assert not any("auth_user" in q["sql"] for q in queries.captured_queries)
+
+
+@pytest.mark.django_db
+def test_revoked_or_wrong_api_key_is_rejected(client, api_key):
+    prefix = api_key.partition(".")[0]
+    client.credentials(HTTP_AUTHORIZATION=f"Api-Key {prefix}.not-the-secret")
+    response = client.get(reverse("restaurant-list"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    client.credentials(HTTP_AUTHORIZATION=f"Api-Key {api_key}")
+    assert client.get(reverse("restaurant-list")).status_code == status.HTTP_200_OK
+
+    call_command("api_keys", "revoke", prefix, stdout=io.StringIO())
+    assert ApiKey.objects.get(prefix=prefix).revoked_at is not None
+    response = client.get(reverse("restaurant-list"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
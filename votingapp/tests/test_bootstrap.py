@@ -0,0 +1,17 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_bootstrap_creates_the_superuser_once(monkeypatch, capsys):
+    monkeypatch.delenv("DJANGO_SUPERUSER_PASSWORD", raising=False)
+    call_command("bootstrap")
+    assert not User.objects.filter(username="votingapp").exists()
+    assert "No pending migrations." in capsys.readouterr().out
+
+    monkeypatch.setenv("DJANGO_SUPERUSER_PASSWORD", "secret-password")
+    call_command("bootstrap")
+    call_command("bootstrap")
+    user = User.objects.get(username="votingapp")
+    assert user.is_superuser and user.check_password("secret-password")
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.models import Vote
+
+
+@pytest.mark.django_db
+def test_restaurant_list_is_not_modified_until_a_restaurant_changes(
+    client, setup_vote_tests
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    response = client.get(reverse("restaurant-list"))
+    assert response.status_code == status.HTTP_200_OK
+    etag = response["ETag"]
+    assert "Last-Modified" in response
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("restaurant-list"), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not any("voting_restaurant" in q["sql"] for q in queries.captured_queries)
+
+    client.patch(
+        reverse("restaurant-detail", kwargs={"pk": restaurant_ids[0]}),
+        {"name": "Renamed"},
+    )
+    response = client.get(reverse("restaurant-list"), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_winners_are_not_modified_until_the_next_vote(client, setup_vote_tests):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    url = reverse("restaurant-get-winners")
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], today)
+
+    response = client.get(url)
+    assert "no-cache" in response["Cache-Control"]
+    etag = response["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not any("voting_dailytally" in q["sql"] for q in queries.captured_queries)
+
+    Vote.objects.cast(restaurant_ids[1], user_ids[0], today)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    yesterday = (today - timedelta(days=1)).isoformat()
+    response = client.get(url, data={"date": yesterday})
+    assert "immutable" in response["Cache-Control"]
@@ -0,0 +1,194 @@
+from datetime import date, timedelta
+
+import pytest
+import time_machine
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting import counters, signals, vote_queue, winners
+from voting.counters import LEADERS, SharedCounters
+from voting.models import DailyTally, VotingUser
+from voting.winners import query_winners
+
+# Transactional, as the counters are updated when votes are committed.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def make_counters(path, **options):
+    return SharedCounters(
+        **{
+            "enabled": True,
+            "path": str(path),
+            "user_slots": 64,
+            "restaurant_slots": 64,
+            "load_timeout": 30,
+            "run": 1,
+            **options,
+        }
+    )
+
+
+@pytest.fixture
+def shared(monkeypatch, tmp_path):
+    shared = make_counters(tmp_path / "counters")
+    for module in (counters, signals, vote_queue, winners):
+        monkeypatch.setattr(module, "shared_counters", shared)
+    return shared
+
+
+def test_over_limit_votes_are_rejected_without_queries(
+    setup_vote_tests, shared, vote, post_vote
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    for _ in range(limit):
+        vote(restaurant_ids[0], user_ids[0])
+    assert shared.quota(user_ids[0], date.today()) == (limit, limit)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post_vote(restaurant_ids[0], user_ids[0])
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert not any("voting_dailyquota" in query["sql"] for query in queries)
+
+    # Raising the limit lets the user vote again right away.
+    user = VotingUser.objects.get(pk=user_ids[0])
+    user.limit = limit + 1
+    user.save()
+    vote(restaurant_ids[0], user_ids[0])
+
+    # Unknown restaurants are still told apart from exceeded limits.
+    response = post_vote(restaurant_ids[-1] + 100, user_ids[0])
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_winners_are_ranked_from_counters(client, setup_vote_tests, shared, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    for user_id, restaurant_id in [
+        (user_ids[0], restaurant_ids[0]),
+        (user_ids[0], restaurant_ids[1]),
+        (user_ids[1], restaurant_ids[1]),
+        (user_ids[1], restaurant_ids[1]),
+        (user_ids[2], restaurant_ids[2]),
+        (user_ids[2], restaurant_ids[2]),
+    ]:
+        vote(restaurant_id, user_id)
+
+    assert shared.winners(today, 3) == query_winners(today, 3)
+    with CaptureQueriesContext(connection) as queries:
+        assert shared.winners(today, 2) == query_winners(today, 2)[:2]
+    assert len(queries) == 1  # query_winners only
+    assert shared.winners(today, LEADERS + 1) is None
+
+    response = client.get(reverse("restaurant-get-winners"))
+    assert [winner["id"] for winner in response.data["winners"]] == [
+        restaurant_ids[1],
+        restaurant_ids[2],
+        restaurant_ids[0],
+    ]
+
+
+def test_counters_load_from_the_database(setup_vote_tests, tmp_path, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    # Votes cast while no server process kept counters.
+    for restaurant_id in restaurant_ids[:3]:
+        vote(restaurant_id, user_ids[0])
+
+    shared = make_counters(tmp_path / "counters")
+    assert shared.quota(user_ids[0], today) == (3, limit)
+    assert shared.quota(user_ids[1], today) is None
+    assert shared.winners(today, 3) == query_winners(today, 3)
+    # Other days are left to the database.
+    assert shared.winners(today - timedelta(days=1), 3) is None
+
+    # A new server run loads them again.
+    shared.record(today, quotas={user_ids[0]: (limit, limit)})
+    assert shared.quota(user_ids[0], today) == (limit, limit)
+    assert make_counters(tmp_path / "counters", run=2).quota(user_ids[0], today) == (
+        3,
+        limit,
+    )
+
+
+def test_counters_roll_over_to_the_next_day(setup_vote_tests, shared, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    vote(restaurant_ids[0], user_ids[0])
+    assert shared.quota(user_ids[0], date.today()) == (1, limit)
+
+    tomorrow = date.today() + timedelta(days=1)
+    with time_machine.travel(tomorrow):
+        assert shared.quota(user_ids[0], tomorrow) is None
+        assert shared.winners(tomorrow, 3) == []
+        vote(restaurant_ids[1], user_ids[0])
+        assert shared.quota(user_ids[0], tomorrow) == (1, limit)
+        assert shared.winners(tomorrow, 3)[0]["id"] == restaurant_ids[1]
+
+
+def test_processes_merge_committed_values_in_any_order(tmp_path):
+    today = date.today()
+    first = make_counters(tmp_path / "counters")
+    second = make_counters(tmp_path / "counters")
+    assert first.winners(today, 3) == []
+
+    second.record(today, quotas={7: (2, 5)}, tallies={3: (1.5, 1)})
+    first.record(today, quotas={7: (1, 5)}, tallies={3: (1.0, 1)})
+    assert first.quota(7, today) == second.quota(7, today) == (2, 5)
+    assert first.restaurants.get(3) == (6, 1)
+
+
+def test_rebuilt_tallies_reload_the_counters(setup_vote_tests, shared, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    vote(restaurant_ids[0], user_ids[0])
+    # Drifted tallies are higher than the votes.
+    DailyTally.objects.filter(date=today).update(total_votes=10)
+    shared.invalidate()
+    assert shared.winners(today, 1)[0]["total_votes"] == 10
+
+    call_command("rebuild_tallies", "--date", today.isoformat(), verbosity=0)
+    assert shared.winners(today, 1)[0]["total_votes"] == 1
+
+
+def test_full_counters_fall_back_to_the_database(setup_vote_tests, tmp_path, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    for user_id in user_ids:
+        vote(restaurant_ids[0], user_id)
+
+    shared = make_counters(tmp_path / "counters", user_slots=2)
+    assert shared.quota(user_ids[0], today) is None
+    assert shared.winners(today, 3) is None
+
+
+def test_committed_votes_never_undo_a_changed_limit(tmp_path):
+    today = date.today()
+    shared = make_counters(tmp_path / "counters")
+    assert shared.winners(today, 3) == []
+
+    shared.record(today, quotas={7: (2, 5)})
+    shared.set_limit(7, 3)
+    # A vote committed before the limit was lowered.
+    shared.record(today, quotas={7: (3, 5)})
+    assert shared.quota(7, today) == (3, 3)
+
+    shared.set_limit(8, 1)
+    shared.record(today, quotas={8: (1, 4)})
+    assert shared.quota(8, today) == (1, 1)
+
+
+def test_processes_without_a_server_run_leave_the_store_alone(tmp_path):
+    today = date.today()
+    server = make_counters(tmp_path / "counters")
+    server.record(today, quotas={7: (1, 5)})
+    assert server.quota(7, today) == (1, 5)
+
+    command = make_counters(tmp_path / "counters", run=None)
+    assert command.quota(7, today) is None
+    command.record(today, quotas={7: (2, 5)})
+    assert server.quota(7, today) == (2, 5)
+
+    command.invalidate()
+    assert server.quota(7, today) is None
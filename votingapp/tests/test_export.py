@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.exports import EXPORT_FIELDS
+
+
+@pytest.fixture
+def votes(setup_vote_tests, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    for user_id in user_ids:
+        for restaurant_id in restaurant_ids[:2]:
+            vote(restaurant_id, user_id)
+    return len(user_ids) * 2
+
+
+@pytest.mark.django_db
+def test_export_votes_as_csv_in_one_query(client, votes):
+    response = client.get(reverse("vote-export"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"].startswith("text/csv")
+
+    with CaptureQueriesContext(connection) as queries:
+        content = b"".join(response.streaming_content).decode()
+    assert len(queries) == 1
+
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert len(rows) == votes
+    assert list(rows[0]) == EXPORT_FIELDS
+    assert rows[0]["restaurant_name"].startswith("Test restaurant")
+    assert rows[0]["voting_user_username"].startswith("test_username")
+
+
+@pytest.mark.django_db
+def test_export_votes_as_gzipped_ndjson(client, votes):
+    response = client.get(
+        reverse("vote-export"),
+        data={"format": "ndjson", "from": date.today().isoformat()},
+        HTTP_ACCEPT_ENCODING="gzip, deflate",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Encoding"] == "gzip"
+
+    content = gzip.decompress(b"".join(response.streaming_content)).decode()
+    records = [json.loads(line) for line in content.splitlines()]
+    assert len(records) == votes
+    assert records[0]["date"] == date.today().isoformat()
+    assert records[0]["weight"] == 1.0
+
+
+@pytest.mark.django_db
+def test_export_votes_filters_by_date(client, votes):
+    response = client.get(reverse("vote-export"), data={"to": "2020-01-01"})
+    content = b"".join(response.streaming_content).decode()
+    assert content.splitlines() == [",".join(EXPORT_FIELDS)]
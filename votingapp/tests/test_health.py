@@ -0,0 +1,26 @@
+import pytest
+from django.db import DatabaseError
+from django.urls import reverse
+from rest_framework import status
+
+
+@pytest.mark.django_db
+def test_healthz_needs_no_authentication_or_queries(client, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        response = client.get(reverse("healthz"))
+    assert response.status_code == status.HTTP_200_OK
+    assert "no-cache" in response["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_readyz_reports_an_unreachable_database(client, monkeypatch):
+    assert client.get(reverse("readyz")).status_code == status.HTTP_200_OK
+
+    def unavailable(*args, **kwargs):
+        raise DatabaseError("connection refused")
+
+    monkeypatch.setattr(
+        "django.db.backends.base.base.BaseDatabaseWrapper.cursor", unavailable
+    )
+    response = client.get(reverse("readyz"))
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,74 @@
+import json
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from voting.models import DailyQuota, DailyTally, Restaurant, Vote, VotingUser
+
+
+@pytest.fixture
+def import_files(tmp_path):
+    users = tmp_path / "users.csv"
+    users.write_text("id,username,limit\n10,alice,3\n11,bob,5\n")
+    restaurants = tmp_path / "restaurants.csv"
+    restaurants.write_text("id,name\n20,Pizza\n21,Sushi\n")
+    votes = tmp_path / "votes.jsonl"
+    rows = [
+        {"restaurant_id": 20, "voting_user_id": 10, "date": "2023-02-01"},
+        {"restaurant_id": 21, "voting_user_id": 10, "date": "2023-02-01"},
+        {"restaurant_id": 21, "voting_user_id": 10, "date": "2023-02-01"},
+        {"restaurant_id": 21, "voting_user_id": 11, "date": "2023-02-01"},
+        {"restaurant_id": 20, "voting_user_id": 99, "date": "2023-02-01"},
+        {"restaurant_id": 20, "voting_user_id": 11, "date": "2023-02-02"},
+    ]
+    votes.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(users), str(restaurants), str(votes)
+
+
+@pytest.mark.django_db
+def test_import_votes_computes_weights_quotas_and_tallies(import_files):
+    users, restaurants, votes = import_files
+    call_command(
+        "import_votes", users=users, restaurants=restaurants, votes=votes, batch_size=2
+    )
+
+    assert set(VotingUser.objects.values_list("id", "username")) == {
+        (10, "alice"),
+        (11, "bob"),
+    }
+    assert Restaurant.objects.count() == 2
+    alice_votes = Vote.objects.filter(voting_user_id=10).order_by("id")
+    assert [(vote.ordinal, vote.weight) for vote in alice_votes] == [
+        (1, 1.0),
+        (2, 0.5),
+        (3, 0.25),
+    ]
+    assert Vote.objects.get(date=date(2023, 2, 2)).weight == 1
+    assert DailyQuota.objects.get(voting_user_id=10).used == 3
+    assert (
+        DailyTally.objects.get(date=date(2023, 2, 1), restaurant_id=21).num_voters == 2
+    )
+    call_command("rebuild_tallies", verify=True)
+
+    # the whole file has been recorded as imported, so nothing is imported twice
+    call_command("import_votes", votes=votes)
+    assert Vote.objects.count() == 5
+
+    Restaurant.objects.create(name="Created after the import")
+    assert Restaurant.objects.order_by("-id").first().id > 21
+
+
+@pytest.mark.django_db
+def test_import_rejects_inconsistent_or_conflicting_ids(tmp_path):
+    users = tmp_path / "users.csv"
+    users.write_text("id,username,limit\n10,alice,3\n,bob,5\n")
+    with pytest.raises(CommandError, match="either every row or none"):
+        call_command("import_votes", users=str(users))
+    assert not VotingUser.objects.exists()
+
+    users.write_text("id,username,limit\n10,alice,3\n10,bob,5\n")
+    with pytest.raises(CommandError, match="voting_votinguser"):
+        call_command("import_votes", users=str(users), restart=True)
+    assert not VotingUser.objects.exists()
@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from voting.metrics import REGISTRY
+
+
+@pytest.fixture
+def metrics(settings):
+    settings.VOTING_METRICS = {
+        "ENABLED": True,
+        "SERVER_TIMING": True,
+        "SLOW_QUERY_MS": 0,
+    }
+    for metric in REGISTRY:
+        metric.clear()
+
+
+@pytest.mark.django_db
+def test_requests_are_measured_per_view(client, api_user, metrics, caplog):
+    client.force_authenticate(user=api_user)
+    with caplog.at_level(logging.WARNING, logger="voting.slow_queries"):
+        response = client.get(reverse("restaurant-get-winners"))
+    assert response.status_code == status.HTTP_200_OK
+    assert 'desc="' in response["Server-Timing"]
+    assert "voting_dailytally" in caplog.text
+
+    response = client.get(reverse("metrics"))
+    assert response.status_code == status.HTTP_200_OK
+    text = response.content.decode()
+    labels = 'view="restaurant-get-winners",method="GET"'
+    assert f"votingapp_request_duration_seconds_count{{{labels}}} 1" in text
+    assert f'votingapp_request_queries_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"votingapp_response_size_bytes_count{{{labels}}} 1" in text
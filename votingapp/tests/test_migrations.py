@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+def migrate(target=None):
+    """Migrates the voting app to the target (the latest by default)."""
+    executor = MigrationExecutor(connection)
+    (node,) = (
+        [("voting", target)] if target else executor.loader.graph.leaf_nodes("voting")
+    )
+    executor.migrate([node])
+    return executor.loader.project_state(node).apps
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ordinals_rebuild_the_tallies_of_racing_votes():
+    apps = migrate("0007_apikey")
+    VotingUser = apps.get_model("voting", "VotingUser")
+    Restaurant = apps.get_model("voting", "Restaurant")
+    Vote = apps.get_model("voting", "Vote")
+    DailyTally = apps.get_model("voting", "DailyTally")
+    user = VotingUser.objects.create(username="alice", limit=5)
+    restaurant = Restaurant.objects.create(name="Pizza")
+    day = date(2023, 2, 1)
+    # Two racing votes that both got the weight of a first vote.
+    for _ in range(2):
+        Vote.objects.create(voting_user=user, restaurant=restaurant, date=day, weight=1)
+    DailyTally.objects.create(
+        date=day, restaurant=restaurant, total_votes=2, num_voters=1
+    )
+
+    try:
+        apps = migrate("0008_vote_ordinal")
+        tally = apps.get_model("voting", "DailyTally").objects.get(date=day)
+        assert (tally.total_votes, tally.num_voters) == (1.5, 1)
+    finally:
+        migrate()
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.models import Restaurant
+from voting.pagination import MAX_PAGE_SIZE
+
+
+@pytest.fixture
+def restaurant_ids(db, client, api_user):
+    client.force_authenticate(user=api_user)
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=f"Test restaurant {i}") for i in range(25)
+    )
+    return sorted((restaurant.pk for restaurant in restaurants), reverse=True)
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_walks_all_pages_without_counting(client, restaurant_ids):
+    seen = []
+    url = reverse("restaurant-list") + "?pagination=cursor&page_size=10"
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert "count" not in response.data
+        assert not any("COUNT(" in q["sql"] for q in queries.captured_queries)
+        seen += [restaurant["id"] for restaurant in response.data["results"]]
+        url = response.data["next"]
+    assert seen == restaurant_ids
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_count_and_page_size_cap(client, restaurant_ids):
+    response = client.get(
+        reverse("restaurant-list"),
+        data={"pagination": "cursor", "count": "exact", "page_size": 1000},
+    )
+    assert response.data["count"] == len(restaurant_ids)
+    assert len(response.data["results"]) == min(len(restaurant_ids), MAX_PAGE_SIZE)
+
+    response = client.get(
+        reverse("restaurant-list"), data={"pagination": "cursor", "count": "estimate"}
+    )
+    assert response.data["count"] == len(restaurant_ids)
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_stays_the_default(client, restaurant_ids):
+    response = client.get(reverse("restaurant-list"), data={"page": 2, "page_size": 20})
+    assert response.data["count"] == len(restaurant_ids)
+    assert [r["id"] for r in response.data["results"]] == restaurant_ids[20:]
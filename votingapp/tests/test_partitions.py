@@ -0,0 +1,97 @@
+import io
+import re
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from voting import partitions
+from voting.models import CompactedDay, DailyTally, Restaurant, Vote, VotingUser
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="vote partitions need PostgreSQL"
+)
+
+
+def test_partition_intervals():
+    assert partitions.interval_range(date(2023, 12, 15), "month") == (
+        date(2023, 12, 1),
+        date(2024, 1, 1),
+    )
+    assert partitions.interval_range(date(2023, 2, 28), "day") == (
+        date(2023, 2, 28),
+        date(2023, 3, 1),
+    )
+    assert (
+        partitions.partition_name(date(2023, 2, 1), "month") == "voting_vote_p2023_02"
+    )
+
+
+def scanned_partitions(queryset):
+    return set(
+        re.findall(r"voting_vote_(?:p\d{4}(?:_\d\d){1,2}|default)", queryset.explain())
+    )
+
+
+@postgresql_only
+@pytest.mark.django_db
+def test_date_filtered_vote_queries_read_a_single_partition():
+    partitions.create_partitions(
+        connection, date(2023, 1, 1), date(2023, 3, 31), "month"
+    )
+    user = VotingUser.objects.create(username="partitioned", limit=5)
+    restaurant = Restaurant.objects.create(name="Partitioned")
+    for day in (date(2023, 1, 10), date(2023, 2, 10), date(2023, 3, 10)):
+        Vote.objects.cast(restaurant.pk, user.pk, day)
+
+    day = date(2023, 2, 10)
+    assert scanned_partitions(Vote.objects.filter(voting_user=user, date=day)) == {
+        "voting_vote_p2023_02"
+    }
+    assert scanned_partitions(DailyTally.objects.from_votes([day])) == {
+        "voting_vote_p2023_02"
+    }
+    assert user.total_votes(user, day) == 1
+
+
+@postgresql_only
+@pytest.mark.django_db
+def test_vote_partitions_command_moves_default_rows_and_detaches():
+    user = VotingUser.objects.create(username="archived", limit=5)
+    restaurant = Restaurant.objects.create(name="Archived")
+    # no partition covers this day yet, the vote lands in the default partition
+    Vote.objects.cast(restaurant.pk, user.pk, date(2001, 5, 5))
+
+    partitions.create_partitions(
+        connection, date(2001, 5, 1), date(2001, 5, 31), "month"
+    )
+    assert scanned_partitions(Vote.objects.filter(date=date(2001, 5, 5))) == {
+        "voting_vote_p2001_05"
+    }
+    assert Vote.objects.filter(date=date(2001, 5, 5)).count() == 1
+
+    out = io.StringIO()
+    call_command("vote_partitions", "--detach-older-than=3650d", "--drop", stdout=out)
+    assert "Dropped voting_vote_p2001_05" in out.getvalue()
+    assert not Vote.objects.filter(date=date(2001, 5, 5)).exists()
+
+
+@postgresql_only
+@pytest.mark.django_db
+def test_detached_days_keep_their_tallies_through_compaction():
+    user = VotingUser.objects.create(username="detached", limit=5)
+    restaurant = Restaurant.objects.create(name="Detached")
+    day = date(2001, 6, 6)
+    partitions.create_partitions(connection, day, day, "month")
+    Vote.objects.cast(restaurant.pk, user.pk, day)
+    Vote.objects.cast(restaurant.pk, user.pk, day)
+    tallies = list(DailyTally.objects.filter(date=day).values())
+
+    call_command("vote_partitions", "--detach-older-than=3650d", stdout=io.StringIO())
+    compacted = CompactedDay.objects.get(date=day)
+    assert compacted.votes_deleted == 2 and compacted.completed_at is not None
+
+    call_command("compact_votes", "--older-than=90d", stdout=io.StringIO())
+    call_command("rebuild_tallies", stdout=io.StringIO())
+    assert list(DailyTally.objects.filter(date=day).values()) == tallies
@@ -0,0 +1,43 @@
+import pytest
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+
+
+@pytest.fixture
+def staff(db, client):
+    cache.clear()
+    group = Group.objects.create(name="restaurant managers")
+    user = User.objects.create_user("manager", password="12345678")
+    user.groups.add(group)
+    client.force_authenticate(user=user)
+    return user, group
+
+
+def create_restaurant(client):
+    return client.post(reverse("restaurant-list"), {"name": "Test restaurant"})
+
+
+@pytest.mark.django_db
+def test_permissions_are_resolved_once_per_version(
+    client, staff, django_assert_num_queries
+):
+    user, group = staff
+    assert create_restaurant(client).status_code == status.HTTP_403_FORBIDDEN
+
+    group.permissions.add(Permission.objects.get(codename="add_restaurant"))
+    with django_assert_num_queries(4):
+        # user and group permissions, then the insert and the catalog version
+        assert create_restaurant(client).status_code == status.HTTP_201_CREATED
+    with django_assert_num_queries(2):
+        assert create_restaurant(client).status_code == status.HTTP_201_CREATED
+
+    user.groups.remove(group)
+    assert create_restaurant(client).status_code == status.HTTP_403_FORBIDDEN
+
+    user.user_permissions.add(Permission.objects.get(codename="add_restaurant"))
+    assert create_restaurant(client).status_code == status.HTTP_201_CREATED
+
+    user.is_active = False
+    assert create_restaurant(client).status_code == status.HTTP_403_FORBIDDEN
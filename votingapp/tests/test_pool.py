@@ -0,0 +1,96 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from voting.metrics import render_metrics
+from voting.pool import IDLE, ConnectionPool, PoolTimeout, close_pools, get_pool
+
+INTRANS = 2
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=IDLE)
+
+    def rollback(self):
+        self.info.transaction_status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**options):
+    return ConnectionPool(
+        **{
+            "min_size": 1,
+            "max_size": 2,
+            "max_idle": 300,
+            "timeout": 0.1,
+            "check_idle": 30,
+            **options,
+        }
+    )
+
+
+def test_connections_are_reused_and_rolled_back():
+    pool = make_pool()
+    connection = pool.getconn(FakeConnection)
+    connection.info.transaction_status = INTRANS
+    pool.putconn(connection)
+
+    assert pool.getconn(FakeConnection) is connection
+    assert connection.info.transaction_status == IDLE
+    assert pool.stats()["opened"] == 1
+
+    # broken connections are not returned to the pool
+    connection.closed = 2
+    pool.putconn(connection)
+    assert pool.stats()["size"] == 0
+    assert pool.getconn(FakeConnection) is not connection
+
+
+def test_checkout_waits_for_a_connection_and_times_out():
+    pool = make_pool(timeout=5)
+    first, second = pool.getconn(FakeConnection), pool.getconn(FakeConnection)
+    threading.Timer(0.05, pool.putconn, [first]).start()
+    assert pool.getconn(FakeConnection) is first
+    assert pool.stats()["waits"] == 1
+
+    pool.timeout = 0.05
+    with pytest.raises(PoolTimeout):
+        pool.getconn(FakeConnection)
+    stats = pool.stats()
+    assert (stats["size"], stats["in_use"], stats["timeouts"]) == (2, 2, 1)
+
+    # The connection held all along is handed out as soon as it is returned.
+    assert not second.closed
+    pool.putconn(second)
+    assert pool.getconn(FakeConnection) is second
+
+
+def test_idle_connections_above_the_minimum_are_closed():
+    pool = make_pool(max_idle=0)
+    first, second = pool.getconn(FakeConnection), pool.getconn(FakeConnection)
+    pool.putconn(first)
+    pool.putconn(second)
+    assert first.closed and not second.closed
+    assert (pool.stats()["size"], pool.stats()["idle"]) == (1, 1)
+
+
+def test_pool_stats_are_served_as_metrics():
+    pool = get_pool("pooled", "votingapp", {"MAX_SIZE": 3})
+    pool.putconn(pool.getconn(FakeConnection))
+    try:
+        metrics = render_metrics()
+        assert (
+            'votingapp_db_pool_idle_connections{alias="pooled",database="votingapp"} 1'
+            in metrics
+        )
+        assert (
+            'votingapp_db_pool_max_connections{alias="pooled",database="votingapp"} 3'
+            in metrics
+        )
+    finally:
+        close_pools()
@@ -0,0 +1,38 @@
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from voting.models import VotingUser
+from voting.renderers import FastJSONRenderer
+from voting.serializers import VotingUserSerializer
+
+
+def test_fast_json_renderer_matches_drf():
+    data = {
+        "date": date(2023, 2, 1),
+        "at": datetime(2023, 2, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "amount": Decimal("1.50"),
+        "id": uuid.UUID(int=1),
+        "label": gettext_lazy("Name"),
+        "items": [1, 0.25, None, "ünïcode"],
+    }
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data, "application/json; indent=2") == (
+        JSONRenderer().render(data, "application/json; indent=2")
+    )
+
+
+@pytest.mark.django_db
+def test_user_list_is_rendered_as_serialized(client, api_user):
+    client.force_authenticate(user=api_user)
+    VotingUser.objects.bulk_create(
+        VotingUser(username=f"user {i}", limit=i) for i in range(3)
+    )
+    response = client.get(reverse("votinguser-list"))
+    expected = VotingUserSerializer(VotingUser.objects.order_by("-pk"), many=True).data
+    assert response.json()["results"] == expected
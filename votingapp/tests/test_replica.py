@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+import time_machine
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.models import Restaurant, Vote, VotingUser
+
+# Transactional, so the replica connection sees the rows the tests commit.
+pytestmark = pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+
+
+@pytest.fixture
+def replica(settings, client, api_user):
+    settings.VOTING_REPLICA = {"ENABLED": True, "STICKY_SECONDS": 5}
+    client.force_authenticate(user=api_user)
+
+
+def queried_tables(client, method, path, **kwargs):
+    """Returns the SQL the request ran on the primary and on the replica."""
+    with CaptureQueriesContext(connections["default"]) as primary:
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+    assert status.is_success(response.status_code)
+    return {
+        "default": " ".join(query["sql"] for query in primary.captured_queries),
+        "replica": " ".join(query["sql"] for query in replica.captured_queries),
+    }
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(client, replica):
+    restaurant = Restaurant.objects.create(name="Pizza")
+    queries = queried_tables(client, "get", reverse("restaurant-list"))
+    assert "voting_restaurant" in queries["replica"]
+    assert "voting_restaurant" not in queries["default"]
+
+    queries = queried_tables(
+        client,
+        "get",
+        reverse("restaurant-get-winners"),
+        data={"from": "2023-02-01", "to": "2023-02-02"},
+    )
+    assert "voting_dailytally" in queries["replica"]
+
+    queries = queried_tables(
+        client, "patch", reverse("restaurant-detail", args=[restaurant.pk]), data={}
+    )
+    assert queries["replica"] == ""
+
+
+def test_writers_read_from_the_primary_for_a_while(client, replica):
+    with time_machine.travel("2023-02-01 12:00:00", tick=False):
+        client.post(reverse("restaurant-list"), {"name": "Sushi"})
+        queries = queried_tables(client, "get", reverse("restaurant-list"))
+        assert "voting_restaurant" in queries["default"]
+        assert queries["replica"] == ""
+
+    with time_machine.travel("2023-02-01 12:00:06", tick=False):
+        queries = queried_tables(client, "get", reverse("restaurant-list"))
+        assert "voting_restaurant" in queries["replica"]
+
+
+def test_streamed_exports_read_from_the_replica(client, replica):
+    restaurant = Restaurant.objects.create(name="Pizza")
+    voting_user = VotingUser.objects.create(username="alice", limit=3)
+    Vote.objects.cast(restaurant.pk, voting_user.pk, date.today())
+    queries = queried_tables(
+        client, "get", reverse("vote-export"), HTTP_ACCEPT="text/csv"
+    )
+    assert "voting_vote" in queries["replica"]
+    assert "voting_vote" not in queries["default"]
+
+
+def test_cached_winners_are_computed_from_the_primary(client, replica):
+    # A lagging replica's winners would be cached under the current versions.
+    queries = queried_tables(client, "get", reverse("restaurant-get-winners"))
+    assert "voting_dailytally" in queries["default"]
+    assert "voting_dailytally" not in queries["replica"]
@@ -4,26 +4,13 @@ from random import randrange
 
 import pytest
 import time_machine
-from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIRequestFactory, force_authenticate, APIClient
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 from voting.viewsets import RestaurantViewSet
 
 
-@pytest.fixture
-def client():
-    return APIClient()
-
-
-@pytest.fixture
-def api_user(db):
-    return User.objects.create_superuser(
-        "votingapp", "votingapp@votingapp.com", password="12345678"
-    )
-
-
 @pytest.mark.django_db
 def test_create_and_retrieve_restaurant(api_user):
     factory = APIRequestFactory()
@@ -64,33 +51,6 @@ def test_create_and_retrieve_restaurant(api_user):
     }
 
 
-@pytest.fixture
-def setup_vote_tests(db, client, api_user):
-    client.force_authenticate(user=api_user)
-    voting_user_ids = []
-    for i in range(0, 3):
-        voting_user_response = client.post(
-            reverse("votinguser-list"),
-            {"username": f"test_username {i}", "limit": 5},
-            format="json",
-        )
-        assert status.is_success(voting_user_response.status_code)
-        voting_user_id = voting_user_response.data["id"]
-        voting_user_limit = voting_user_response.data["limit"]
-        assert voting_user_limit == 5
-        voting_user_ids.append(voting_user_id)
-
-    restaurant_ids = []
-    for i in range(0, 5):
-        restaurant_response = client.post(
-            reverse("restaurant-list"), {"name": f"Test restaurant {i}"}
-        )
-        assert status.is_success(restaurant_response.status_code)
-        restaurant_ids.append(restaurant_response.data["id"])
-
-    return voting_user_ids, restaurant_ids, voting_user_limit
-
-
 @pytest.mark.django_db
 def test_voting_limit(client, setup_vote_tests):
     user_ids, restaurant_ids, limit = setup_vote_tests
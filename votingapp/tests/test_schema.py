@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from voting import schema
+
+
+@pytest.fixture
+def schema_dir(settings, tmp_path, monkeypatch):
+    settings.API_SCHEMA_DIR = tmp_path
+    generated = []
+    generate = schema.generate_schema
+
+    def counting(renderer):
+        generated.append(renderer.format)
+        return generate(renderer)
+
+    monkeypatch.setattr(schema, "generate_schema", counting)
+    return generated
+
+
+def test_schema_is_generated_once_and_validated_by_etag(client, schema_dir):
+    response = client.get(reverse("schema"), HTTP_ACCEPT="application/json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/json"
+    assert "/restaurants/winners" in response.json()["paths"]
+    etag = response["ETag"]
+
+    response = client.get(
+        reverse("schema"), HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert client.get(reverse("schema")).content.startswith(b"openapi:")
+    assert schema_dir == ["json", "yaml"]
+
+    assert client.get(reverse("schema")).status_code == status.HTTP_200_OK
+    assert schema_dir == ["json", "yaml"]
+
+
+def test_built_schema_is_served_without_generating(client, schema_dir, tmp_path):
+    call_command("build_schema")
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".yaml"]
+    schema_dir.clear()
+
+    assert client.get(reverse("schema")).status_code == status.HTTP_200_OK
+    assert schema_dir == []
+
+
+def test_views_do_not_import_drf_spectacular_without_docs():
+    # The setting is read at import time, so check a fresh interpreter.
+    code = (
+        "import sys, django; django.setup(); import votingapp.urls; "
+        "print(sorted(m for m in sys.modules if m.startswith('drf_spectacular')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "votingapp.settings",
+            "VOTINGAPP_DOCS": "0",
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
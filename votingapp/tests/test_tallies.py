@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from voting.models import DailyTally
+
+
+@pytest.mark.django_db
+def test_votes_update_daily_tally(setup_vote_tests, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+
+    vote(restaurant_ids[0], user_ids[0])
+    vote(restaurant_ids[0], user_ids[0])
+    vote(restaurant_ids[0], user_ids[1])
+    vote(restaurant_ids[1], user_ids[0])
+
+    tallies = {
+        tally.restaurant_id: (tally.total_votes, tally.num_voters)
+        for tally in DailyTally.objects.filter(date=date.today())
+    }
+    assert tallies == {restaurant_ids[0]: (2.5, 2), restaurant_ids[1]: (0.25, 1)}
+
+
+@pytest.mark.django_db
+def test_rebuild_tallies_repairs_drift(setup_vote_tests, vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    vote(restaurant_ids[0], user_ids[0])
+    vote(restaurant_ids[1], user_ids[1])
+    call_command("rebuild_tallies", verify=True)
+
+    DailyTally.objects.filter(restaurant_id=restaurant_ids[0]).update(num_voters=7)
+    with pytest.raises(CommandError):
+        call_command("rebuild_tallies", verify=True)
+
+    call_command("rebuild_tallies", dates=[date.today()])
+    call_command("rebuild_tallies", verify=True)
+    assert DailyTally.objects.get(restaurant_id=restaurant_ids[0]).num_voters == 1
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting.models import DailyQuota, Vote
+
+
+def statements(queries):
+    return [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_vote_claims_quota_and_inserts_in_three_statements(setup_vote_tests, post_vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post_vote(restaurant_ids[0], user_ids[0])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert len(statements(queries.captured_queries)) == 3
+
+    response = post_vote(restaurant_ids[1], user_ids[0])
+    assert response.data["remaining_limit"] == limit - 2
+
+    quota = DailyQuota.objects.get(voting_user_id=user_ids[0], date=date.today())
+    assert (quota.used, quota.limit) == (2, limit)
+    votes = Vote.objects.filter(voting_user_id=user_ids[0]).order_by("ordinal")
+    assert [vote.weight for vote in votes] == [1.0, 0.5]
+
+    # The same vote of a quota can't be recorded twice.
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Vote.objects.create(
+            restaurant_id=restaurant_ids[2],
+            voting_user_id=user_ids[0],
+            ordinal=2,
+            date=date.today(),
+        )
+
+
+@pytest.mark.django_db
+def test_rejected_vote_does_not_use_quota(setup_vote_tests, post_vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+
+    response = post_vote(max(restaurant_ids) + 1, user_ids[0])
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = post_vote(restaurant_ids[0], max(user_ids) + 1)
+    assert response.data["detail"] == "User corresponding to user_id not found."
+
+    assert not DailyQuota.objects.exists()
+    assert not Vote.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_vote_applies_limit_and_weights_in_order(
+    client, setup_vote_tests, post_vote
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    post_vote(restaurant_ids[0], user_ids[0])
+
+    items = [{"user_id": user_ids[0], "restaurant_id": restaurant_ids[1]}] * limit
+    items += [
+        {"user_id": user_ids[1], "restaurant_id": restaurant_ids[1]},
+        {"user_id": max(user_ids) + 1, "restaurant_id": restaurant_ids[1]},
+        {"user_id": user_ids[1], "restaurant_id": max(restaurant_ids) + 1},
+    ]
+    response = client.post(reverse("restaurant-bulk-vote"), items, format="json")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert (response.data["accepted"], response.data["rejected"]) == (limit, 3)
+
+    results = response.data["results"]
+    assert [r.get("weight") for r in results[: limit - 1]] == [0.5, 0.25, 0.25, 0.25]
+    assert results[limit - 2]["remaining_limit"] == 0
+    assert not results[limit - 1]["accepted"]
+    assert results[limit]["accepted"] and results[limit]["weight"] == 1
+    assert not results[limit + 1]["accepted"]
+    assert results[limit + 2]["detail"] == "Restaurant not found."
+
+    assert DailyQuota.objects.get(voting_user_id=user_ids[0]).used == limit
+    call_command("rebuild_tallies", verify=True)
+
+
+@pytest.mark.django_db
+def test_bulk_vote_rejects_malformed_payload(client, setup_vote_tests):
+    response = client.post(
+        reverse("restaurant-bulk-vote"), [{"user_id": 1}], format="json"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
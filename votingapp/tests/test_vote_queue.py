@@ -0,0 +1,149 @@
+from datetime import date, timedelta
+
+import pytest
+from rest_framework import status
+
+from voting import viewsets
+from voting.models import DailyQuota, DailyTally, Vote, VoteLimitExceeded
+from voting.vote_queue import VoteQueue, VoteQueueFull
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = VoteQueue(
+        enabled=True,
+        max_pending=3,
+        flush_interval_ms=10,
+        flush_size=100,
+        cache_seconds=60,
+        max_attempts=2,
+    )
+    # Flush explicitly in the test's transaction instead of a background thread.
+    monkeypatch.setattr(queue, "start", lambda: None)
+    monkeypatch.setattr(viewsets, "vote_queue", queue)
+    return queue
+
+
+@pytest.mark.django_db
+def test_queued_votes_count_towards_limit_before_flush(
+    setup_vote_tests, queue, post_vote
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+
+    for i in range(3):
+        response = post_vote(restaurant_ids[0], user_ids[0])
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["remaining_limit"] == limit - i - 1
+    assert queue.pending == 3
+    assert not Vote.objects.exists()
+
+    response = post_vote(restaurant_ids[0], user_ids[1])
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    queue.flush()
+    assert queue.pending == 0
+    assert Vote.objects.count() == 3
+    assert DailyQuota.objects.get(voting_user_id=user_ids[0]).used == 3
+
+    for i in range(3, limit):
+        ordinal, _ = queue.submit(restaurant_ids[1], user_ids[0], today)
+        assert ordinal == i + 1
+        queue.flush()
+    with pytest.raises(VoteLimitExceeded):
+        queue.submit(restaurant_ids[1], user_ids[0], today)
+
+
+@pytest.mark.django_db
+def test_queued_votes_are_rejected_when_over_the_stored_limit(setup_vote_tests, queue):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+
+    queue.submit(restaurant_ids[0], user_ids[0], today)
+    # votes cast by another process since the quota was cached
+    DailyQuota.objects.create(
+        voting_user_id=user_ids[0], date=today, used=limit, limit=limit
+    )
+    queue.flush()
+    assert not Vote.objects.exists()
+
+    queue.max_pending = 0
+    with pytest.raises(VoteQueueFull):
+        queue.submit(restaurant_ids[0], user_ids[1], today)
+
+
+@pytest.fixture
+def failing_day(monkeypatch):
+    """Makes writing the votes of a day fail until failures["left"] runs out."""
+    failures = {"day": None, "left": 0}
+    bulk_cast = Vote.objects.bulk_cast
+
+    def fail_on_day(items, voting_date):
+        if voting_date == failures["day"] and failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("database unavailable")
+        return bulk_cast(items, voting_date)
+
+    monkeypatch.setattr(Vote.objects, "bulk_cast", fail_on_day)
+    return failures
+
+
+@pytest.mark.django_db
+def test_batches_spanning_midnight_are_written_once(
+    setup_vote_tests, queue, failing_day
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    failing_day.update(day=today, left=1)
+
+    queue.submit(restaurant_ids[0], user_ids[0], yesterday)
+    queue.submit(restaurant_ids[0], user_ids[1], today)
+    queue.flush()
+    assert not Vote.objects.exists()
+    assert queue.pending == 2
+
+    queue.flush()
+    assert queue.pending == 0
+    assert Vote.objects.filter(date=yesterday).count() == 1
+    assert Vote.objects.filter(date=today).count() == 1
+    assert DailyTally.objects.get(date=yesterday).total_votes == 1
+
+
+@pytest.mark.django_db
+def test_batches_that_keep_failing_are_dropped(
+    setup_vote_tests, queue, failing_day, caplog
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    failing_day.update(day=today, left=queue.max_attempts)
+
+    queue.submit(restaurant_ids[0], user_ids[0], today)
+    for _ in range(queue.max_attempts):
+        queue.flush()
+    assert queue.pending == 0
+    assert not Vote.objects.exists()
+    # Every acknowledged vote is logged with its data.
+    assert any(
+        record.levelname == "ERROR"
+        and record.getMessage()
+        == f"Queued vote of user {user_ids[0]} for restaurant {restaurant_ids[0]} "
+        f"on {today.isoformat()} was rejected: The vote could not be saved."
+        for record in caplog.records
+    )
+
+    queue.submit(restaurant_ids[0], user_ids[0], today)
+    queue.flush()
+    assert Vote.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_stopped_queue_refuses_votes(setup_vote_tests, queue, post_vote):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    queue.stop()
+    with pytest.raises(VoteQueueFull):
+        queue.submit(restaurant_ids[0], user_ids[0], date.today())
+
+    response = post_vote(restaurant_ids[0], user_ids[0])
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert queue.pending == 0
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+import json
+
+import pytest
+import time_machine
+from django.urls import reverse
+from rest_framework import status
+
+
+@pytest.mark.django_db
+def test_winners_for_date_range_match_single_day_winners(
+    client, setup_vote_tests, vote
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+
+    with time_machine.travel(today - timedelta(days=3)):
+        for restaurant_id in restaurant_ids:
+            vote(restaurant_id, user_ids[0])
+        vote(restaurant_ids[4], user_ids[1])
+    with time_machine.travel(today - timedelta(days=1)):
+        vote(restaurant_ids[2], user_ids[0])
+        vote(restaurant_ids[2], user_ids[0])
+        vote(restaurant_ids[1], user_ids[1])
+
+    response = client.get(
+        reverse("restaurant-get-winners"),
+        data={
+            "from": (today - timedelta(days=4)).isoformat(),
+            "to": today.isoformat(),
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    days = json.loads(b"".join(response.streaming_content))["days"]
+    assert [day["date"] for day in days] == [
+        (today - timedelta(days=offset)).isoformat() for offset in range(4, -1, -1)
+    ]
+    assert [day["count"] for day in days] == [0, 3, 0, 2, 0]
+
+    for day in days:
+        response = client.get(
+            reverse("restaurant-get-winners"), data={"date": day["date"]}
+        )
+        assert day["winners"] == response.data["winners"]
+    assert days[1]["winners"][0]["id"] == restaurant_ids[4]
+
+
+@pytest.mark.django_db
+def test_winners_for_date_range_require_valid_range(client, setup_vote_tests):
+    today = date.today()
+    for params in (
+        {"from": today.isoformat()},
+        {"from": today.isoformat(), "to": (today - timedelta(days=1)).isoformat()},
+        {"from": "2020-01-01", "to": "2023-01-01"},
+    ):
+        response = client.get(reverse("restaurant-get-winners"), data=params)
+        assert not status.is_success(response.status_code)
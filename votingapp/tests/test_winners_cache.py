@@ -0,0 +1,138 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from voting import winners
+from voting.metrics import winners_cache_requests
+from voting.models import Restaurant, Vote
+
+
+def get_winners(client, voting_date):
+    response = client.get(
+        reverse("restaurant-get-winners"), data={"date": voting_date.isoformat()}
+    )
+    return response.data["winners"]
+
+
+@pytest.mark.django_db
+def test_winners_are_cached_until_votes_change_them(client, setup_vote_tests):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], today)
+
+    hits = winners_cache_requests.value(("hit",))
+    assert [w["id"] for w in get_winners(client, today)] == [restaurant_ids[0]]
+    with CaptureQueriesContext(connection) as queries:
+        get_winners(client, today)
+    assert not any("voting_dailytally" in q["sql"] for q in queries.captured_queries)
+    assert winners_cache_requests.value(("hit",)) == hits + 1
+
+    Vote.objects.cast(restaurant_ids[1], user_ids[0], today)
+    Vote.objects.cast(restaurant_ids[1], user_ids[1], today)
+    assert get_winners(client, today)[0]["id"] == restaurant_ids[1]
+
+    Restaurant.objects.filter(pk=restaurant_ids[1]).update(name="Renamed")
+    Restaurant.objects.get(pk=restaurant_ids[1]).save()
+    assert get_winners(client, today)[0]["name"] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_winners_are_never_older_than_their_etag(client, setup_vote_tests, monkeypatch):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], today)
+    url = reverse("restaurant-get-winners")
+    client.get(url)
+
+    # Votes recorded by another process, whose cache this one does not share.
+    monkeypatch.setattr(winners, "invalidate_winners", lambda dates=None: None)
+    Vote.objects.cast(restaurant_ids[1], user_ids[0], today)
+    Vote.objects.cast(restaurant_ids[1], user_ids[1], today)
+    response = client.get(url)
+    assert response.data["winners"][0]["id"] == restaurant_ids[1]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_past_winners_are_refreshed_by_tally_rebuilds(client, setup_vote_tests):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    past = date.today() - timedelta(days=10)
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], past)
+    Vote.objects.cast(restaurant_ids[1], user_ids[0], past)
+    assert len(get_winners(client, past)) == 2
+
+    Vote.objects.filter(date=past, restaurant_id=restaurant_ids[1]).delete()
+    assert len(get_winners(client, past)) == 2
+    call_command("rebuild_tallies", "--date", past.isoformat(), stdout=io.StringIO())
+    assert len(get_winners(client, past)) == 1
+
+
+@pytest.mark.django_db
+def test_stampede_lock_makes_other_requests_wait_for_the_entry(
+    setup_vote_tests, monkeypatch
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], today)
+    expected = winners.get_winners(today)
+    winners.invalidate_winners([today])
+
+    # Another request holds the lock and stores the entry a bit later.
+    original_add = winners.winners_cache().add
+
+    def add(key, value, timeout=None):
+        if key.endswith(":lock"):
+            entry = key.removesuffix(":lock")
+            threading.Timer(
+                0.05, winners.winners_cache().set, (entry, expected)
+            ).start()
+            return False
+        return original_add(key, value, timeout)
+
+    monkeypatch.setattr(winners.winners_cache(), "add", add)
+    with CaptureQueriesContext(connection) as queries:
+        assert winners.get_winners(today) == expected
+    assert not queries.captured_queries
+
+
+def test_gunicorn_workers_share_the_cache(tmp_path):
+    def run_worker(statement):
+        """Runs a statement in an interpreter configured like a Gunicorn worker."""
+        code = (
+            "import runpy, django; runpy.run_path('gunicorn.conf.py'); "
+            f"django.setup(); from voting import winners; {statement}"
+        )
+        return subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "votingapp.settings",
+                "VOTINGAPP_CACHE_DIR": str(tmp_path),
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    run_worker("winners.invalidate_winners()")
+    version = run_worker(
+        "print(winners.winners_cache().get(winners.GLOBAL_VERSION_KEY))"
+    )
+    assert version != "None"
+    assert version == run_worker(
+        "print(winners.winners_cache().get(winners.GLOBAL_VERSION_KEY))"
+    )
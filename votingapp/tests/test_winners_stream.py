@@ -0,0 +1,189 @@
+import asyncio
+import io
+import json
+from datetime import date
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from rest_framework import status
+
+from voting import live, winners
+from voting.authentication import verified_keys
+from voting.live import WinnersHub
+from voting.models import Vote
+from votingapp.asgi import application
+
+
+class ScriptedHub(WinnersHub):
+    """Serves the winners event of the current state of a test."""
+
+    def __init__(self, interval, buffer_size):
+        super().__init__(interval, buffer_size)
+        self.state = 0
+        self.computed = 0
+
+    def compute(self, voting_date, size, state):
+        if self.state == state:
+            return state, None
+        self.computed += 1
+        return self.state, json.dumps({"state": self.state})
+
+
+def test_subscribers_share_coalesced_updates():
+    async def run():
+        hub = ScriptedHub(interval=0.05, buffer_size=10)
+        first = hub.subscribe(date(2023, 2, 1), 3)
+        second = hub.subscribe(date(2023, 2, 1), 3)
+        assert json.loads(await first.queue.get()) == {"state": 0}
+        assert json.loads(await second.queue.get()) == {"state": 0}
+
+        # A burst of changes within one interval is pushed once.
+        for state in range(1, 6):
+            hub.state = state
+        assert json.loads(await first.queue.get()) == {"state": 5}
+        assert json.loads(await second.queue.get()) == {"state": 5}
+        await asyncio.sleep(0.15)
+        assert first.queue.empty() and second.queue.empty()
+        assert hub.computed == 2
+
+        # Late subscribers get the latest update right away.
+        third = hub.subscribe(date(2023, 2, 1), 3)
+        assert json.loads(third.queue.get_nowait()) == {"state": 5}
+
+        for subscription in (first, second, third):
+            hub.unsubscribe(date(2023, 2, 1), 3, subscription)
+        assert hub.topics == {}
+
+    asyncio.run(run())
+
+
+def test_slow_subscribers_are_dropped():
+    async def run():
+        hub = ScriptedHub(interval=0.01, buffer_size=2)
+        slow = hub.subscribe(date(2023, 2, 1), 3)
+        fast = hub.subscribe(date(2023, 2, 1), 3)
+        received = []
+        for state in range(1, 5):
+            received.append(json.loads(await fast.queue.get()))
+            hub.state = state
+        assert received == [{"state": state} for state in range(4)]
+        assert slow.dropped and not fast.dropped
+        assert [event async for event in slow] == []
+        hub.unsubscribe(date(2023, 2, 1), 3, fast)
+        hub.unsubscribe(date(2023, 2, 1), 3, slow)
+
+    asyncio.run(run())
+
+
+def http_scope(path, query_string=b"", headers=()):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), *headers],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+
+async def stream_events(scope, count, on_event=None):
+    """Runs the ASGI application until it streamed `count` events."""
+    messages = []
+    events = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        body = message.get("body", b"")
+        if body.startswith(b"event: winners\n"):
+            events.append(json.loads(body.split(b"data: ", 1)[1]))
+            if len(events) == count:
+                disconnected.set()
+            elif on_event:
+                await on_event(events)
+
+    await asyncio.wait_for(application(scope, receive, send), 10)
+    return messages, events
+
+
+@pytest.fixture
+def api_key(api_user):
+    verified_keys.clear()
+    out = io.StringIO()
+    call_command("api_keys", "issue", api_user.username, "--name", "kiosk", stdout=out)
+    return out.getvalue().splitlines()[-1]
+
+
+@pytest.fixture
+def stream_hub(monkeypatch):
+    monkeypatch.setattr(live, "hub", WinnersHub(interval=0.05, buffer_size=10))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_winners_stream_pushes_ranking_changes(
+    setup_vote_tests, vote, api_key, stream_hub
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+
+    async def vote_after_first_event(events):
+        await sync_to_async(vote, thread_sensitive=False)(
+            restaurant_ids[1], user_ids[0]
+        )
+
+    vote(restaurant_ids[0], user_ids[0])
+    scope = http_scope(
+        "/restaurants/winners/stream",
+        f"date={today}&size=2".encode(),
+        [(b"authorization", f"Api-Key {api_key}".encode())],
+    )
+    messages, events = asyncio.run(
+        stream_events(scope, 2, on_event=vote_after_first_event)
+    )
+
+    start = messages[0]
+    assert start["status"] == status.HTTP_200_OK
+    assert (b"content-type", b"text/event-stream") in start["headers"]
+    assert [[winner["id"] for winner in event["winners"]] for event in events] == [
+        [restaurant_ids[0]],
+        [restaurant_ids[0], restaurant_ids[1]],
+    ]
+    assert events[0]["date"] == today.isoformat()
+    assert live.hub.topics == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_winners_stream_requires_authentication(api_user, stream_hub):
+    messages, events = asyncio.run(
+        stream_events(http_scope("/restaurants/winners/stream"), 1)
+    )
+    assert messages[0]["status"] == status.HTTP_401_UNAUTHORIZED
+    assert events == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_changed_state_is_computed_past_stale_cached_winners(
+    setup_vote_tests, monkeypatch
+):
+    user_ids, restaurant_ids, limit = setup_vote_tests
+    today = date.today()
+    hub = WinnersHub(interval=0.05, buffer_size=10)
+    Vote.objects.cast(restaurant_ids[0], user_ids[0], today)
+    state, event = hub.compute(today, 1, None)
+
+    # Votes recorded by another process, whose cache this one does not share.
+    monkeypatch.setattr(winners, "invalidate_winners", lambda dates=None: None)
+    Vote.objects.cast(restaurant_ids[1], user_ids[0], today)
+    Vote.objects.cast(restaurant_ids[1], user_ids[1], today)
+    state, event = hub.compute(today, 1, state)
+    assert json.loads(event)["winners"][0]["id"] == restaurant_ids[1]
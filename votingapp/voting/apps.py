@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class VotingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "voting"
+
+    def ready(self):
+        from voting import signals  # noqa: F401
+
+        if settings.SERVE_API_DOCS:
+            from voting import schema  # noqa: F401
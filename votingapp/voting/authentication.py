@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from voting.caching import TTLCache
+from voting.models import ApiKey
+
+verified_keys = TTLCache(
+    settings.VOTING_API_KEYS["CACHE_SIZE"], settings.VOTING_API_KEYS["CACHE_SECONDS"]
+)
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    Authenticates "Authorization: Api-Key <key>" headers.
+
+    Keys are stored as keyed SHA-256 hashes, so verifying one costs a single
+    HMAC instead of a password hash. Verified keys are remembered per process
+    for VOTING_API_KEYS["CACHE_SECONDS"]; revoking a key drops it from this
+    process' cache right away and from the others when their entry expires.
+    """
+
+    keyword = "Api-Key"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid API key header."))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_("Invalid API key header."))
+
+        digest = ApiKey.hash(key)
+        user = verified_keys.get(digest)
+        if user is None:
+            api_key = ApiKey.objects.verify(key, digest)
+            if api_key is None or not api_key.user.is_active:
+                raise exceptions.AuthenticationFailed(_("Invalid API key."))
+            user = api_key.user
+            verified_keys.set(digest, user)
+        return user, None
+
+    def authenticate_header(self, request):
+        return self.keyword
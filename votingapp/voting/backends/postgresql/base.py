@@ -0,0 +1,39 @@
+"""
+The PostgreSQL backend with connections from an in-process pool (see
+voting.pool), configured by the "POOL" entry of the database settings:
+
+    "POOL": {"MIN_SIZE": 1, "MAX_SIZE": 10, "MAX_IDLE": 300, "TIMEOUT": 5}
+
+Closing a connection returns it to the pool. With CONN_MAX_AGE a thread keeps
+its connection between requests; without it, every request checks one out.
+"""
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from voting.pool import get_pool
+
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias, self.settings_dict["NAME"], self.settings_dict.get("POOL", {})
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        connection = self.pool.getconn(lambda: connect(conn_params))
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,20 @@
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def conditional(request, build, etag, last_modified=None, **cache_control):
+    """
+    Answers with 304 Not Modified when the client's If-None-Match or
+    If-Modified-Since still match, without calling build(); otherwise returns
+    build()'s response. Both carry the validators and Cache-Control directives.
+    """
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = (
+        get_conditional_response(request, etag=etag, last_modified=timestamp) or build()
+    )
+    response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+    patch_cache_control(response, **cache_control)
+    return response
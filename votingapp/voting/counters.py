@@ -0,0 +1,435 @@
+"""
+Counters of today's votes shared by the app server processes of a host.
+
+The store is a memory-mapped file (in /dev/shm by default) holding, for one
+day, every voting user's used votes and limit and every restaurant's total
+weight and number of voters. It only mirrors values the database committed:
+every vote records the quota and tally rows as its statements returned them,
+and values are merged by taking the maximum, which is correct in any order
+because they only grow during a day. Limits can shrink, so they are only
+taken from votes of users the store does not hold yet; changed limits are
+written by set_limit. Over-limit votes are then rejected and winners ranked
+without queries.
+
+The first process that needs a day the store does not hold loads it from the
+database, i.e. after the server (re)starts and on day rollover; votes committed
+while it loads are merged as well. Until then, and if a table fills up, callers
+use the database. Processes lock the file with flock, so the store only sees
+the votes of the app servers of its host. Processes without a server run, such
+as management commands, neither read nor load the store; they only record,
+invalidate and apply limits for the running server.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.conf import settings
+from django.db import router
+
+MAGIC = b"VOTECNT1"
+HEADER = struct.Struct("=8sqqqqqdqqqq")
+HEADER_SIZE = 128
+ITEM_SIZE = 8
+# Restaurants kept ranked, the most winners the counters serve.
+LEADERS = 16
+
+COLD, LOADING, WARM, FULL = range(4)
+
+# Fibonacci hashing spreads consecutive ids over the table.
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+
+def quarters(total_votes):
+    """Vote weights are multiples of 0.25, stored as exact integers."""
+    return round(total_votes * 4)
+
+
+class Header:
+    fields = (
+        "magic",
+        "user_slots",
+        "restaurant_slots",
+        "run",
+        "day",
+        "state",
+        "loading_since",
+        "generation",
+        "catalog",
+        "users",
+        "restaurants",
+    )
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.__dict__.update(zip(self.fields, HEADER.unpack_from(buffer)))
+
+    def save(self):
+        HEADER.pack_into(
+            self.buffer, 0, *(getattr(self, field) for field in self.fields)
+        )
+
+    def holds(self, voting_date):
+        return self.state == WARM and self.day == voting_date.toordinal()
+
+
+class Table:
+    """An open addressing hash table of int64 columns keyed by positive ids."""
+
+    def __init__(self, buffer, offset, slots, columns):
+        self.slots = slots
+        self.capacity = slots * 3 // 4
+        size = slots * ITEM_SIZE
+        self.arrays = [
+            buffer[offset + i * size : offset + (i + 1) * size]
+            for i in range(columns + 1)
+        ]
+        self.ids, *self.columns = (array.cast("q") for array in self.arrays)
+
+    def find(self, key):
+        """Returns (slot, whether the key is in it); the slot is free if not."""
+        mask = self.slots - 1
+        slot = ((key * GOLDEN) & MASK64) >> 32 & mask
+        while True:
+            found = self.ids[slot]
+            if found == key or found == 0:
+                return slot, found == key
+            slot = (slot + 1) & mask
+
+    def get(self, key):
+        slot, found = self.find(key)
+        return tuple(column[slot] for column in self.columns) if found else None
+
+    def merge(self, key, values, count, fixed=()):
+        """
+        Raises the key's columns to at least the values; returns the new count.
+        The `fixed` columns are only set when the key is added.
+        """
+        slot, found = self.find(key)
+        if not found:
+            if count >= self.capacity:
+                raise OverflowError
+            self.ids[slot] = key
+            count += 1
+        for index, (column, value) in enumerate(zip(self.columns, values)):
+            if index in fixed:
+                if not found:
+                    column[slot] = value
+            elif value > column[slot]:
+                column[slot] = value
+        return count
+
+    def clear(self):
+        for array in self.arrays:
+            array[:] = bytes(len(array))
+
+    def rank(self, key):
+        """Orders restaurants by total weight, then voters, like query_winners."""
+        total, num_voters = self.get(key)
+        return -total, -num_voters, key
+
+
+class SharedCounters:
+    def __init__(self, enabled, path, user_slots, restaurant_slots, load_timeout, run):
+        self.enabled = enabled
+        self.path = path
+        self.user_slots = user_slots
+        self.restaurant_slots = restaurant_slots
+        self.load_timeout = load_timeout
+        self.run = run
+        self.size = (
+            HEADER_SIZE + (LEADERS + 3 * (user_slots + restaurant_slots)) * ITEM_SIZE
+        )
+
+        # flock is held per open file, which all threads of a process share.
+        self._lock = threading.Lock()
+        self._pid = None
+        self._names = (None, {})
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.VOTING_SHARED_COUNTERS
+        return cls(
+            enabled=options["ENABLED"],
+            path=options["PATH"],
+            user_slots=options["USER_SLOTS"],
+            restaurant_slots=options["RESTAURANT_SLOTS"],
+            load_timeout=options["LOAD_TIMEOUT"],
+            run=options["RUN"],
+        )
+
+    def quota(self, voting_user_id, voting_date):
+        """Returns the user's (used, limit) of the day; None if not known."""
+        if not self.warm(voting_date):
+            return None
+        with self.locked() as header:
+            return self.users.get(voting_user_id) if header.holds(voting_date) else None
+
+    def over_limit(self, voting_user_id, restaurant_id, voting_date):
+        """
+        Whether a vote is known to exceed the user's limit. Votes for
+        restaurants the store has not seen are left to the database, which
+        tells a missing restaurant from an exceeded limit.
+        """
+        if not self.warm(voting_date):
+            return False
+        with self.locked() as header:
+            if not header.holds(voting_date):
+                return False
+            quota = self.users.get(voting_user_id)
+            if quota is None or quota[0] < quota[1]:
+                return False
+            known = self.restaurants.find(restaurant_id)[1]
+            catalog = header.catalog
+        version, names = self._names
+        return known or (version == catalog and restaurant_id in names)
+
+    def winners(self, voting_date, size):
+        """The day's top restaurants like query_winners; None if not known."""
+        if size > LEADERS or not self.warm(voting_date):
+            return None
+        with self.locked() as header:
+            if not header.holds(voting_date):
+                return None
+            catalog = header.catalog
+            ranked = [
+                (restaurant_id, *self.restaurants.get(restaurant_id))
+                for restaurant_id in self.leaders.tolist()[:size]
+                if restaurant_id
+            ]
+        names = self.restaurant_names(catalog, [row[0] for row in ranked])
+        return [
+            {
+                "id": restaurant_id,
+                "name": names[restaurant_id],
+                "total_votes": total / 4,
+                "num_voters": num_voters,
+            }
+            for restaurant_id, total, num_voters in ranked
+            if restaurant_id in names
+        ]
+
+    def record(self, voting_date, quotas=(), tallies=()):
+        """
+        Merges the {user_id: (used, limit)} quotas and {restaurant_id:
+        (total_votes, num_voters)} tallies of a day the database committed.
+        """
+        if not self.enabled or voting_date != date.today():
+            return
+        # Starts loading the day if the store holds an older one.
+        self.warm(voting_date)
+        with self.locked() as header:
+            if header.day == voting_date.toordinal() and header.state in (
+                LOADING,
+                WARM,
+            ):
+                self.merge(header, dict(quotas), dict(tallies))
+                header.save()
+
+    def set_limit(self, voting_user_id, limit):
+        """Applies a changed limit, which votes committed before never undo."""
+        if not self.enabled:
+            return
+        with self.locked() as header:
+            slot, found = self.users.find(voting_user_id)
+            if found:
+                self.users.columns[1][slot] = limit
+            elif header.day == date.today().toordinal() and header.state in (
+                LOADING,
+                WARM,
+            ):
+                # Votes of the user committed later keep this limit.
+                self.merge(header, {voting_user_id: (0, limit)}, {})
+                header.save()
+
+    def catalog_changed(self):
+        """Makes every process look up restaurant names again."""
+        if not self.enabled:
+            return
+        with self.locked() as header:
+            header.catalog += 1
+            header.save()
+
+    def invalidate(self):
+        """Makes the next caller load the store again, e.g. after tallies shrank."""
+        if not self.enabled:
+            return
+        with self.locked() as header:
+            header.state = COLD
+            header.generation += 1
+            header.save()
+
+    def warm(self, voting_date):
+        """
+        Returns whether the store holds the day, loading it first if it holds
+        an older day or was invalidated.
+        """
+        if not self.enabled or self.run is None or voting_date != date.today():
+            return False
+        day = voting_date.toordinal()
+        with self.locked() as header:
+            if header.day == day and header.state in (WARM, FULL):
+                return header.state == WARM
+            if header.day > day:
+                return False
+            if (
+                header.day == day
+                and header.state == LOADING
+                and time.time() - header.loading_since < self.load_timeout
+            ):
+                return False
+            # A load that timed out left values that are still valid.
+            if header.day != day or header.state == COLD:
+                self.users.clear()
+                self.restaurants.clear()
+                self.set_leaders([])
+                header.users = header.restaurants = 0
+            header.day = day
+            header.state = LOADING
+            header.loading_since = time.time()
+            header.generation += 1
+            generation = header.generation
+            header.save()
+
+        quotas, tallies = self.load(voting_date)
+        with self.locked() as header:
+            if header.generation != generation:
+                # Invalidated or taken over while loading.
+                return False
+            self.merge(header, quotas, tallies)
+            if header.state == LOADING:
+                header.state = WARM
+            header.save()
+            return header.state == WARM
+
+    def load(self, voting_date):
+        from voting.models import DailyQuota, DailyTally
+
+        # A replica may lag behind the votes merged in the meantime.
+        using = router.db_for_write(DailyQuota)
+        # The quota rows keep the limit of the user's last vote.
+        quotas = {
+            user_id: (used, limit)
+            for user_id, used, limit in DailyQuota.objects.using(using)
+            .filter(date=voting_date)
+            .values_list("voting_user_id", "used", "voting_user__limit")
+            .iterator()
+        }
+        tallies = {
+            restaurant_id: (total_votes, num_voters)
+            for restaurant_id, total_votes, num_voters in DailyTally.objects.using(
+                using
+            )
+            .filter(date=voting_date)
+            .values_list("restaurant_id", "total_votes", "num_voters")
+            .iterator()
+        }
+        return quotas, tallies
+
+    def merge(self, header, quotas, tallies):
+        try:
+            for user_id, quota in quotas.items():
+                header.users = self.users.merge(
+                    user_id, quota, header.users, fixed=(1,)
+                )
+            for restaurant_id, (total_votes, num_voters) in tallies.items():
+                header.restaurants = self.restaurants.merge(
+                    restaurant_id,
+                    (quarters(total_votes), num_voters),
+                    header.restaurants,
+                )
+                self.promote(restaurant_id)
+        except OverflowError:
+            # Callers use the database until the next day.
+            header.state = FULL
+
+    def promote(self, restaurant_id):
+        """
+        Keeps the leaders ranked after a restaurant's counts grew. Counts never
+        shrink, so a restaurant can only overtake others and none of the
+        restaurants left out can belong among the leaders.
+        """
+        ranked = [key for key in self.leaders.tolist() if key]
+        if restaurant_id not in ranked:
+            ranked.append(restaurant_id)
+        ranked.sort(key=self.restaurants.rank)
+        self.set_leaders(ranked[:LEADERS])
+
+    def set_leaders(self, ranked):
+        for position in range(LEADERS):
+            self.leaders[position] = ranked[position] if position < len(ranked) else 0
+
+    def restaurant_names(self, catalog, restaurant_ids):
+        """Returns {id: name} of restaurants, cached until the catalog changes."""
+        from voting.models import Restaurant
+
+        version, names = self._names
+        if version != catalog:
+            names = {}
+        missing = set(restaurant_ids) - names.keys()
+        if missing:
+            names = {
+                **names,
+                **dict(
+                    Restaurant.objects.filter(pk__in=missing).values_list("pk", "name")
+                ),
+            }
+        self._names = catalog, names
+        return names
+
+    @contextmanager
+    def locked(self):
+        """Yields the header with the store locked against all processes."""
+        with self._lock:
+            self.open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield Header(self._mmap)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def open(self):
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+            buffer = mmap.mmap(fd, self.size)
+            header = Header(buffer)
+            if (header.magic, header.user_slots, header.restaurant_slots) != (
+                MAGIC,
+                self.user_slots,
+                self.restaurant_slots,
+            ):
+                buffer[:] = bytes(self.size)
+                header = Header(buffer)
+                header.magic = MAGIC
+                header.user_slots = self.user_slots
+                header.restaurant_slots = self.restaurant_slots
+            if self.run is not None and header.run != self.run:
+                # Votes may have been written while no server was running.
+                header.run = self.run
+                header.state = COLD
+                header.generation += 1
+            header.save()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        memory = memoryview(buffer)
+        offset = HEADER_SIZE + LEADERS * ITEM_SIZE
+        self.leaders = memory[HEADER_SIZE:offset].cast("q")
+        self.users = Table(memory, offset, self.user_slots, 2)
+        self.restaurants = Table(
+            memory, offset + 3 * self.user_slots * ITEM_SIZE, self.restaurant_slots, 2
+        )
+        self._fd, self._mmap, self._pid = fd, buffer, os.getpid()
+
+
+shared_counters = SharedCounters.from_settings()
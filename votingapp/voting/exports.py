@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+from voting.models import vote_weight
+
+EXPORT_FIELDS = [
+    "id",
+    "date",
+    "weight",
+    "restaurant_id",
+    "restaurant_name",
+    "voting_user_id",
+    "voting_user_username",
+]
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(votes):
+    """Yields vote rows with restaurant and user details joined in, in id order."""
+    return (
+        votes.order_by("id")
+        .annotate(weight=vote_weight())
+        .values_list(
+            "id",
+            "date",
+            "weight",
+            "restaurant_id",
+            "restaurant__name",
+            "voting_user_id",
+            "voting_user__username",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows):
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        record["date"] = record["date"].isoformat()
+        lines.append(json.dumps(record))
+        if len(lines) == CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,269 @@
+"""
+Live winners over Server-Sent Events, served by asgi.py on STREAM_PATH:
+
+    GET /restaurants/winners/stream?date=2023-02-01&size=3
+
+Every process runs one poller per (date, size) that has subscribers. Once per
+VOTING_WINNERS_STREAM["INTERVAL"] it checks the day's last vote id and the
+restaurant catalog version, and when either changed it computes the winners
+once for all of that topic's subscribers, pushing them only if the ranking
+changed. Bursts of votes therefore produce at most one push per interval.
+Subscribers that fall BUFFER events behind are disconnected.
+"""
+import asyncio
+import io
+import json
+import logging
+from datetime import date
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from voting.models import VersionStamp, Vote
+from voting.winners import get_winners
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = "/restaurants/winners/stream"
+MAX_SIZE = 10
+
+
+class Subscription:
+    def __init__(self, buffer_size):
+        self.queue = asyncio.Queue(buffer_size)
+        self.dropped = False
+
+    def push(self, event):
+        """Queues an event; returns False when the subscriber is too far behind."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self):
+        # Discard the backlog so the subscriber learns right away.
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class Topic:
+    def __init__(self, hub, voting_date, size):
+        self.hub = hub
+        self.voting_date = voting_date
+        self.size = size
+        self.subscriptions = set()
+        self.state = None
+        self.event = None
+        self.task = None
+
+    async def poll(self):
+        try:
+            while self.subscriptions:
+                try:
+                    self.state, event = await sync_to_async(
+                        self.hub.compute, thread_sensitive=False
+                    )(self.voting_date, self.size, self.state)
+                except Exception:
+                    logger.exception("Computing live winners failed")
+                else:
+                    if event is not None and event != self.event:
+                        self.event = event
+                        self.publish(event)
+                await asyncio.sleep(self.hub.interval)
+        finally:
+            self.task = None
+
+    def publish(self, event):
+        for subscription in list(self.subscriptions):
+            if not subscription.push(event):
+                logger.info("Dropping a slow live winners subscriber")
+                self.subscriptions.discard(subscription)
+                subscription.drop()
+
+
+class WinnersHub:
+    """Shares one winners computation per (date, size) among subscribers."""
+
+    def __init__(self, interval, buffer_size):
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.topics = {}
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.VOTING_WINNERS_STREAM
+        return cls(options["INTERVAL"], options["BUFFER"])
+
+    def subscribe(self, voting_date, size):
+        key = voting_date, size
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = Topic(self, voting_date, size)
+        subscription = Subscription(self.buffer_size)
+        topic.subscriptions.add(subscription)
+        if topic.event is not None:
+            subscription.push(topic.event)
+        if topic.task is None:
+            topic.task = asyncio.get_running_loop().create_task(topic.poll())
+        return subscription
+
+    def unsubscribe(self, voting_date, size, subscription):
+        topic = self.topics.get((voting_date, size))
+        if topic is None:
+            return
+        topic.subscriptions.discard(subscription)
+        if not topic.subscriptions:
+            del self.topics[voting_date, size]
+            if topic.task is not None:
+                topic.task.cancel()
+
+    def compute(self, voting_date, size, state):
+        """
+        Returns the day's (state, winners event), or (state, None) when neither
+        its votes nor the catalog changed since the given state.
+        """
+        try:
+            current = (
+                Vote.objects.last_id(voting_date),
+                VersionStamp.objects.current(VersionStamp.CATALOG)[0],
+            )
+            if current == state:
+                return state, None
+            # Keyed by the state, so it cannot move past a stale cached ranking.
+            winners = get_winners(voting_date, size, state=current)
+            event = json.dumps(
+                {
+                    "date": voting_date.isoformat(),
+                    "count": len(winners),
+                    "winners": winners,
+                }
+            )
+            return current, event
+        finally:
+            close_old_connections()
+
+
+hub = WinnersHub.from_settings()
+
+
+def authenticate(scope):
+    """Returns the user authenticated by the API's authentication classes."""
+    request = Request(
+        ASGIRequest(scope, io.BytesIO()),
+        authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = request.user
+    except APIException:
+        return None
+    finally:
+        close_old_connections()
+    return user if user.is_authenticated else None
+
+
+async def send_json(send, status, body):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+
+async def winners_stream(scope, receive, send):
+    """The ASGI application streaming the winners of a day as SSE events."""
+    if scope["method"] != "GET":
+        await send_json(
+            send, 405, {"detail": f'Method "{scope["method"]}" not allowed.'}
+        )
+        return
+    user = await sync_to_async(authenticate, thread_sensitive=False)(scope)
+    if user is None:
+        await send_json(
+            send, 401, {"detail": "Authentication credentials were not provided."}
+        )
+        return
+    query = parse_qs(scope["query_string"].decode())
+    try:
+        voting_date = (
+            date.fromisoformat(query["date"][0]) if "date" in query else date.today()
+        )
+        size = int(query.get("size", ["3"])[0])
+        if not 1 <= size <= MAX_SIZE:
+            raise ValueError
+    except ValueError:
+        await send_json(
+            send,
+            422,
+            {
+                "detail": "Date must be in ISO format, i.e. yyyy-mm-dd, and size "
+                f"between 1 and {MAX_SIZE}"
+            },
+        )
+        return
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                # Proxies such as nginx must pass events through right away.
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    subscription = hub.subscribe(voting_date, size)
+    events = asyncio.ensure_future(
+        forward_events(subscription, send, settings.VOTING_WINNERS_STREAM["KEEPALIVE"])
+    )
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait([events, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        events.cancel()
+        disconnected.cancel()
+        hub.unsubscribe(voting_date, size, subscription)
+    if events.done() and not events.cancelled():
+        events.result()
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def forward_events(subscription, send, keepalive):
+    iterator = aiter(subscription)
+    while True:
+        try:
+            event = await asyncio.wait_for(anext(iterator), keepalive)
+        except asyncio.TimeoutError:
+            message = b": keepalive\n\n"
+        except StopAsyncIteration:
+            return
+        else:
+            message = f"event: winners\ndata: {event}\n\n".encode()
+        await send({"type": "http.response.body", "body": message, "more_body": True})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
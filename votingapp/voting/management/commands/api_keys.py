@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = "Issues, lists and revokes API keys"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="action", required=True)
+        issue = subparsers.add_parser("issue", help="Issue a new key for a user")
+        issue.add_argument("username")
+        issue.add_argument("--name", default="", help="What the key is used for")
+        revoke = subparsers.add_parser("revoke", help="Revoke a key")
+        revoke.add_argument("prefix", help="Key prefix, the part before the dot")
+        listing = subparsers.add_parser("list", help="List keys")
+        listing.add_argument("--username")
+
+    def handle(self, *args, action, **options):
+        getattr(self, action)(**options)
+
+    def issue(self, username, name, **options):
+        try:
+            user = get_user_model().objects.get_by_natural_key(username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {username} does not exist.")
+        api_key, key = ApiKey.objects.issue(user, name)
+        self.stdout.write(
+            f"Issued key {api_key.prefix} for {username}. It is shown only once:"
+        )
+        self.stdout.write(key)
+
+    def revoke(self, prefix, **options):
+        api_key = ApiKey.objects.filter(prefix=prefix, revoked_at__isnull=True).first()
+        if api_key is None:
+            raise CommandError(f"No active key with prefix {prefix}.")
+        api_key.revoke()
+        self.stdout.write(self.style.SUCCESS(f"Revoked key {prefix}."))
+
+    def list(self, username=None, **options):
+        api_keys = ApiKey.objects.select_related("user").order_by("created_at")
+        if username:
+            api_keys = api_keys.filter(user__username=username)
+        for api_key in api_keys:
+            state = (
+                f"revoked {api_key.revoked_at:%Y-%m-%d}"
+                if api_key.revoked_at
+                else "active"
+            )
+            self.stdout.write(
+                f"{api_key.prefix}  {api_key.user.username}  {api_key.name}  "
+                f"created {api_key.created_at:%Y-%m-%d}  {state}"
+            )
@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepares the database for serving: applies the committed migrations that "
+        "are pending, if any, and creates the superuser unless it exists. Safe to "
+        "run on every start. The superuser's password is read from "
+        "DJANGO_SUPERUSER_PASSWORD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", default="votingapp")
+        parser.add_argument("--email", default="votingapp@gmail.com")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, username, email, database, **options):
+        started = time.perf_counter()
+        executor = MigrationExecutor(connections[database])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            self.stdout.write(f"Applying {len(plan)} pending migrations.")
+            call_command(
+                "migrate",
+                database=database,
+                interactive=False,
+                verbosity=options["verbosity"],
+            )
+        else:
+            self.stdout.write("No pending migrations.")
+
+        users = get_user_model()._default_manager.db_manager(database)
+        password = os.environ.get("DJANGO_SUPERUSER_PASSWORD")
+        if users.filter(username=username).exists():
+            self.stdout.write(f"Superuser {username} exists.")
+        elif not password:
+            self.stderr.write(
+                "DJANGO_SUPERUSER_PASSWORD is not set, no superuser was created."
+            )
+        else:
+            users.create_superuser(username, email, password)
+            self.stdout.write(f"Created superuser {username}.")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Ready in {time.perf_counter() - started:.2f}s.")
+        )
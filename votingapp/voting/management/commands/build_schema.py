@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the OpenAPI schema served on /api/schema/ for the current code, "
+        "so the app server doesn't generate it, and removes the schemas of other "
+        "code versions. Does nothing when the schema is already rendered."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Render the schema again"
+        )
+
+    def handle(self, *args, force=False, **options):
+        if not settings.SERVE_API_DOCS:
+            self.stdout.write("The API docs are not served (VOTINGAPP_DOCS=0).")
+            return
+
+        from drf_spectacular.views import SpectacularAPIView
+
+        from voting.schema import (
+            code_version,
+            generate_schema,
+            schema_path,
+            write_schema,
+        )
+
+        current = set()
+        for renderer_class in SpectacularAPIView.renderer_classes:
+            renderer = renderer_class()
+            path = schema_path(renderer)
+            if path not in current and (force or not path.exists()):
+                write_schema(path, generate_schema(renderer))
+                self.stdout.write(f"Rendered {path}.")
+            current.add(path)
+        for path in path.parent.glob("openapi-*"):
+            if path not in current:
+                path.unlink()
+        self.stdout.write(
+            self.style.SUCCESS(f"The schema of code version {code_version()} is ready.")
+        )
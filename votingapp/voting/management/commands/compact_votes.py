@@ -0,0 +1,96 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from voting.management.utils import batched, days
+from voting.models import CompactedDay, DailyTally, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds raw votes older than the given age into the daily tallies, which "
+        "keep the total weight and number of voters per restaurant, and deletes "
+        "them in batches. Winners of compacted days are served from the tallies "
+        "as before. An interrupted run is finished by running it again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=days,
+            required=True,
+            help="Compact the votes of days older than this, e.g. 90d",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, older_than, batch_size, **options):
+        started = time.monotonic()
+        connection = connections[router.db_for_write(Vote)]
+        size_before = self.table_size(connection)
+
+        cutoff = date.today() - older_than
+        dates = sorted(
+            DailyTally.objects.with_votes()
+            .filter(date__lt=cutoff)
+            .values_list("date", flat=True)
+            .distinct()
+        )
+        # Tallies are rebuilt from the votes once more before a day is marked
+        # as compacted; from then on they are the day's only record.
+        for chunk in batched(dates, 31):
+            with transaction.atomic(using=connection.alias):
+                DailyTally.objects.rebuild(chunk)
+                CompactedDay.objects.bulk_create(
+                    CompactedDay(date=voting_date) for voting_date in chunk
+                )
+
+        deleted = 0
+        pending = CompactedDay.objects.filter(completed_at__isnull=True)
+        for compacted in pending.order_by("date"):
+            deleted += self.delete_votes(connection, compacted, batch_size)
+
+        size_after = self.table_size(connection)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compacted {len(dates)} days, deleted {deleted} votes "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+        )
+        if size_before is not None:
+            self.stdout.write(
+                f"Vote table and indexes: {size_before / 2**20:.1f} MiB -> "
+                f"{size_after / 2**20:.1f} MiB. Space of deleted rows is reused "
+                "after VACUUM and returned when their partition is dropped."
+            )
+
+    def delete_votes(self, connection, compacted, batch_size):
+        deleted = 0
+        votes = Vote.objects.filter(date=compacted.date)
+        while True:
+            with transaction.atomic(using=connection.alias):
+                ids = list(votes.values_list("pk", flat=True)[:batch_size])
+                if not ids:
+                    break
+                count, _ = votes.filter(pk__in=ids).delete()
+                CompactedDay.objects.filter(pk=compacted.pk).update(
+                    votes_deleted=F("votes_deleted") + count
+                )
+            deleted += count
+        compacted.completed_at = timezone.now()
+        compacted.save(update_fields=["completed_at"])
+        return deleted
+
+    def table_size(self, connection):
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT SUM(pg_total_relation_size(relid)) "
+                "FROM pg_partition_tree(%s)",
+                [Vote._meta.db_table],
+            )
+            return cursor.fetchone()[0]
@@ -0,0 +1,318 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import date
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connections, router, transaction
+
+from voting.management.utils import batched
+from voting.models import (
+    CompactedDay,
+    DailyQuota,
+    DailyTally,
+    ImportProgress,
+    Restaurant,
+    VersionStamp,
+    Vote,
+    VotingUser,
+)
+
+
+def read_rows(path):
+    """Yields the rows of a CSV file with a header line or of a JSON lines file."""
+    with open(path, newline="") as file:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports voting users, restaurants and votes from CSV or JSON lines files. "
+        "Uses COPY FROM STDIN on PostgreSQL and bulk_create elsewhere. Every batch "
+        "is committed together with the import progress, so an interrupted import "
+        "continues where it stopped when run again with the same files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", help="File with username, limit and optionally id columns"
+        )
+        parser.add_argument(
+            "--restaurants", help="File with name and optionally id columns"
+        )
+        parser.add_argument(
+            "--votes",
+            help="File with restaurant_id, voting_user_id and date columns; the "
+            "weight of a vote follows from its position among the user's votes "
+            "of the day",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore recorded progress and import the files from the start",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create even on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.restart = options["restart"]
+        self.connection = connections[router.db_for_write(Vote)]
+        self.use_copy = (
+            self.connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        if not any(options[kind] for kind in ("users", "restaurants", "votes")):
+            raise CommandError(
+                "Provide at least one of --users, --restaurants, --votes."
+            )
+
+        if options["users"]:
+            self.import_file(
+                options["users"],
+                "users",
+                self.parse_user,
+                VotingUser,
+                ["username", "limit"],
+            )
+        if options["restaurants"]:
+            self.import_file(
+                options["restaurants"],
+                "restaurants",
+                self.parse_restaurant,
+                Restaurant,
+                ["name"],
+            )
+            # Bulk inserts skip the signals that bump the catalog version.
+            VersionStamp.objects.bump(VersionStamp.CATALOG)
+        if options["users"] or options["restaurants"]:
+            self.reset_sequences()
+        if options["votes"]:
+            self.import_votes(options["votes"])
+
+    def import_file(self, path, kind, parse, model, fields):
+        progress, rows = self.start(path, kind)
+        with_ids = None
+        for batch in batched(rows, self.batch_size):
+            objects = [parse(row) for row in batch]
+            if with_ids is None:
+                with_ids = objects[0].pk is not None
+            if any((obj.pk is not None) != with_ids for obj in objects):
+                raise CommandError(
+                    f"{kind}: either every row or none must have an id, "
+                    f"as the first row {'does' if with_ids else 'does not'}."
+                )
+            with transaction.atomic(using=self.connection.alias):
+                self.write(model, objects, ["id", *fields] if with_ids else fields)
+                self.advance(progress, len(batch))
+        self.finish(progress)
+
+    def import_votes(self, path):
+        # Dates of skipped rows are collected too, so resumed imports still
+        # rebuild every tally the file touches.
+        self.dates = set()
+        progress, rows = self.start(path, "votes")
+        self.user_limits = {}
+        self.restaurant_ids = set()
+        self.used = {}
+        self.compacted = set(CompactedDay.objects.values_list("date", flat=True))
+        rejected = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(using=self.connection.alias):
+                rejected += self.import_votes_batch(progress.rows, batch)
+                self.advance(progress, len(batch))
+
+        self.stdout.write(f"votes: rebuilding tallies of {len(self.dates)} days")
+        dates = sorted(self.dates)
+        for chunk in batched(dates, 31):
+            DailyTally.objects.rebuild(chunk)
+        self.finish(progress)
+        if rejected:
+            self.stderr.write(f"votes: {rejected} rows rejected")
+
+    def import_votes_batch(self, first_line, batch):
+        parsed = []
+        for line, row in enumerate(batch, start=first_line + 1):
+            try:
+                parsed.append(
+                    (
+                        line,
+                        int(row["restaurant_id"]),
+                        int(row["voting_user_id"]),
+                        date.fromisoformat(row["date"]),
+                    )
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                self.reject(line, f"malformed row ({e!r})")
+        self.load_known_keys(parsed)
+
+        votes = []
+        rejected = len(batch) - len(parsed)
+        for line, restaurant_id, user_id, voting_date in parsed:
+            self.dates.add(voting_date)
+            if voting_date in self.compacted:
+                self.reject(line, f"votes of {voting_date} have been compacted")
+            elif user_id not in self.user_limits:
+                self.reject(line, f"unknown voting_user_id {user_id}")
+            elif restaurant_id not in self.restaurant_ids:
+                self.reject(line, f"unknown restaurant_id {restaurant_id}")
+            else:
+                used = self.used.get((user_id, voting_date), 0)
+                self.used[user_id, voting_date] = used + 1
+                votes.append(
+                    Vote(
+                        restaurant_id=restaurant_id,
+                        voting_user_id=user_id,
+                        ordinal=used + 1,
+                        date=voting_date,
+                    )
+                )
+                continue
+            rejected += 1
+
+        self.write(Vote, votes, ["restaurant_id", "voting_user_id", "ordinal", "date"])
+        touched = {(vote.voting_user_id, vote.date) for vote in votes}
+        DailyQuota.objects.bulk_create(
+            [
+                DailyQuota(
+                    voting_user_id=user_id,
+                    date=voting_date,
+                    used=self.used[user_id, voting_date],
+                    limit=self.user_limits[user_id],
+                )
+                for user_id, voting_date in touched
+            ],
+            update_conflicts=True,
+            unique_fields=["voting_user", "date"],
+            update_fields=["used", "limit"],
+        )
+        return rejected
+
+    def load_known_keys(self, parsed):
+        """Validates foreign keys and loads quota counters with a query per kind."""
+        user_ids = {user_id for _, _, user_id, _ in parsed} - self.user_limits.keys()
+        self.user_limits.update(
+            VotingUser.objects.filter(pk__in=user_ids).values_list("pk", "limit")
+        )
+        restaurant_ids = {restaurant_id for _, restaurant_id, _, _ in parsed}
+        self.restaurant_ids.update(
+            Restaurant.objects.filter(
+                pk__in=restaurant_ids - self.restaurant_ids
+            ).values_list("pk", flat=True)
+        )
+
+        keys = {
+            (user_id, voting_date) for _, _, user_id, voting_date in parsed
+        } - self.used.keys()
+        if keys:
+            quotas = DailyQuota.objects.filter(
+                voting_user_id__in={user_id for user_id, _ in keys},
+                date__in={voting_date for _, voting_date in keys},
+            ).values_list("voting_user_id", "date", "used")
+            self.used.update(dict.fromkeys(keys, 0))
+            self.used.update(
+                ((user_id, voting_date), used)
+                for user_id, voting_date, used in quotas
+                if (user_id, voting_date) in keys
+            )
+
+    def write(self, model, objects, fields):
+        if not objects:
+            return
+        if not self.use_copy:
+            try:
+                model.objects.bulk_create(objects, batch_size=1000)
+            except DatabaseError as e:
+                raise CommandError(f"Inserting into {model._meta.db_table} failed: {e}")
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objects:
+            writer.writerow(getattr(obj, field) for field in fields)
+        buffer.seek(0)
+        quote = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.copy_expert(
+                    f"COPY {quote(model._meta.db_table)} "
+                    f"({', '.join(quote(field) for field in fields)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            except DatabaseError as e:
+                raise CommandError(f"COPY into {model._meta.db_table} failed: {e}")
+
+    def reset_sequences(self):
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), [VotingUser, Restaurant]
+        )
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def parse_user(self, row):
+        try:
+            return VotingUser(
+                id=int(row["id"]) if row.get("id") else None,
+                username=row["username"],
+                limit=int(row["limit"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise CommandError(f"Malformed user row {row!r}: {e!r}")
+
+    def parse_restaurant(self, row):
+        try:
+            return Restaurant(
+                id=int(row["id"]) if row.get("id") else None, name=row["name"]
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise CommandError(f"Malformed restaurant row {row!r}: {e!r}")
+
+    def start(self, path, kind):
+        progress, _ = ImportProgress.objects.get_or_create(
+            source=f"{kind}:{os.path.abspath(path)}"
+        )
+        if self.restart:
+            progress.rows = 0
+            progress.save(update_fields=["rows", "updated_at"])
+        rows = read_rows(path)
+        if progress.rows:
+            self.stdout.write(f"{kind}: resuming after row {progress.rows}")
+            for row in islice(rows, progress.rows):
+                if kind == "votes" and row.get("date"):
+                    self.dates.add(date.fromisoformat(row["date"]))
+        self.kind = kind
+        self.started = time.monotonic()
+        self.imported = 0
+        return progress, rows
+
+    def advance(self, progress, count):
+        progress.rows += count
+        progress.save(update_fields=["rows", "updated_at"])
+        self.imported += count
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f"{self.kind}: {progress.rows} rows done "
+            f"({self.imported / elapsed:.0f} rows/s)"
+        )
+
+    def finish(self, progress):
+        self.stdout.write(
+            self.style.SUCCESS(f"{self.kind}: finished after {progress.rows} rows")
+        )
+
+    def reject(self, line, reason):
+        self.stderr.write(f"votes: row {line} rejected: {reason}")
@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.models import DailyTally
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds or verifies daily restaurant tallies from raw votes. Days whose "
+        "votes have been compacted are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            action="append",
+            dest="dates",
+            type=date.fromisoformat,
+            help="Only process this date (ISO format); can be repeated",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Report tallies that differ from raw votes instead of rebuilding",
+        )
+
+    def handle(self, *args, dates=None, verify=False, **options):
+        if verify:
+            expected = {
+                (row["date"], row["restaurant_id"]): row
+                for row in DailyTally.objects.from_votes(dates).iterator()
+            }
+            self.verify(expected, DailyTally.objects.with_votes(dates))
+            return
+
+        deleted, created = DailyTally.objects.rebuild(dates)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Replaced {deleted} tallies with {created} rebuilt from votes."
+            )
+        )
+
+    def verify(self, expected, tallies):
+        mismatches = 0
+        for tally in tallies.iterator():
+            row = expected.pop((tally.date, tally.restaurant_id), None)
+            if row is None:
+                mismatches += 1
+                self.stderr.write(
+                    f"{tally.date} restaurant {tally.restaurant_id}: "
+                    "tally exists but there are no votes"
+                )
+            elif (tally.total_votes, tally.num_voters) != (
+                row["total_votes"],
+                row["num_voters"],
+            ):
+                mismatches += 1
+                self.stderr.write(
+                    f"{tally.date} restaurant {tally.restaurant_id}: "
+                    f"tally has {tally.total_votes}/{tally.num_voters}, "
+                    f"votes give {row['total_votes']}/{row['num_voters']}"
+                )
+        for (voting_date, restaurant_id), row in expected.items():
+            mismatches += 1
+            self.stderr.write(
+                f"{voting_date} restaurant {restaurant_id}: tally is missing"
+            )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} tallies differ from raw votes.")
+        self.stdout.write(self.style.SUCCESS("All tallies match raw votes."))
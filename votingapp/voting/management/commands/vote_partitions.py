@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from voting import partitions
+from voting.management.utils import days
+from voting.models import CompactedDay, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates upcoming vote partitions and detaches or drops old ones "
+        "(PostgreSQL only). Run it daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.VOTING_PARTITIONS["PRECREATE"],
+            help="Number of intervals to create partitions for after the current one",
+        )
+        parser.add_argument(
+            "--detach-older-than",
+            type=days,
+            help="Detach partitions whose votes are all older than this, e.g. 400d. "
+            "Detached partitions are kept as standalone tables for archiving; their "
+            "days are recorded as compacted, so their tallies are kept",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of keeping them",
+        )
+        parser.add_argument(
+            "--list",
+            action="store_true",
+            dest="list_only",
+            help="Only list the attached partitions",
+        )
+
+    def handle(self, *args, ahead, detach_older_than, drop, list_only, **options):
+        connection = connections[router.db_for_write(Vote)]
+        if not partitions.is_partitioned(connection):
+            raise CommandError("The vote table is not partitioned (PostgreSQL only).")
+
+        if list_only:
+            for name, start, end in partitions.partitions(connection):
+                self.stdout.write(f"{name}  {start} - {end - timedelta(days=1)}")
+            return
+
+        with transaction.atomic(using=connection.alias):
+            interval = settings.VOTING_PARTITIONS["INTERVAL"]
+            created = partitions.create_partitions(
+                connection, date.today(), partitions.horizon(interval, ahead)
+            )
+            detached = []
+            if detach_older_than is not None:
+                detached = partitions.detach_partitions(
+                    connection, date.today() - detach_older_than, drop=drop
+                )
+                # The tallies are the only record of these days' votes now.
+                CompactedDay.objects.bulk_create(
+                    [
+                        CompactedDay(
+                            date=voting_date,
+                            votes_deleted=count,
+                            completed_at=timezone.now(),
+                        )
+                        for _, votes in detached
+                        for voting_date, count in votes.items()
+                    ],
+                    ignore_conflicts=True,
+                )
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        for name, _ in detached:
+            self.stdout.write(f"{'Dropped' if drop else 'Detached'} {name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(created)} partitions created, {len(detached)} "
+                f"{'dropped' if drop else 'detached'}."
+            )
+        )
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from itertools import islice
+
+
+def days(value):
+    """Parses a command line age like "90d" or "90" into a timedelta."""
+    try:
+        return timedelta(days=int(value.removesuffix("d")))
+    except ValueError:
+        raise ValueError(f"{value!r} is not a number of days like 90d")
+
+
+def batched(items, size):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
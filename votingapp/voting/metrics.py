@@ -0,0 +1,269 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from voting.pool import pools
+
+slow_query_logger = logging.getLogger("voting.slow_queries")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histogram:
+    """A thread-safe Prometheus histogram with labels."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # bucket counts (not cumulative, the last one is +Inf), sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for labels, (counts, total) in series:
+            label_text = ",".join(
+                f'{name}="{value}"' for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """A thread-safe Prometheus counter with labels."""
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            label_text = ",".join(
+                f'{name}="{label}"' for name, label in zip(self.label_names, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+request_duration = Histogram(
+    "votingapp_request_duration_seconds",
+    "Time spent handling requests.",
+    ("view", "method"),
+    DURATION_BUCKETS,
+)
+request_db_duration = Histogram(
+    "votingapp_request_db_duration_seconds",
+    "Time spent in database queries per request.",
+    ("view", "method"),
+    DURATION_BUCKETS,
+)
+request_queries = Histogram(
+    "votingapp_request_queries",
+    "Database queries per request.",
+    ("view", "method"),
+    QUERY_BUCKETS,
+)
+response_size = Histogram(
+    "votingapp_response_size_bytes",
+    "Size of non-streaming response bodies.",
+    ("view", "method"),
+    SIZE_BUCKETS,
+)
+
+winners_cache_requests = Counter(
+    "votingapp_winners_cache_requests_total",
+    "Winners lookups by cache result.",
+    ("result",),
+)
+
+REGISTRY = [
+    request_duration,
+    request_db_duration,
+    request_queries,
+    response_size,
+    winners_cache_requests,
+]
+
+
+# (metric, type, help, pool stats key)
+POOL_METRICS = (
+    ("votingapp_db_pool_connections", "gauge", "Open pooled connections.", "size"),
+    ("votingapp_db_pool_idle_connections", "gauge", "Idle pooled connections.", "idle"),
+    ("votingapp_db_pool_max_connections", "gauge", "Pool size limit.", "max_size"),
+    (
+        "votingapp_db_pool_waiting",
+        "gauge",
+        "Threads waiting for a connection.",
+        "waiting",
+    ),
+    (
+        "votingapp_db_pool_checkouts_total",
+        "counter",
+        "Connection checkouts.",
+        "checkouts",
+    ),
+    (
+        "votingapp_db_pool_waits_total",
+        "counter",
+        "Checkouts that had to wait for a connection.",
+        "waits",
+    ),
+    (
+        "votingapp_db_pool_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection.",
+        "wait_seconds",
+    ),
+    (
+        "votingapp_db_pool_timeouts_total",
+        "counter",
+        "Checkouts that gave up waiting.",
+        "timeouts",
+    ),
+    ("votingapp_db_pool_opened_total", "counter", "Connections opened.", "opened"),
+    ("votingapp_db_pool_closed_total", "counter", "Connections closed.", "closed"),
+)
+
+
+def render_pool_stats():
+    stats = [
+        (key, pool.stats())
+        for key, pool in sorted(pools().items(), key=lambda item: str(item[0]))
+    ]
+    lines = []
+    for name, kind, documentation, stat in POOL_METRICS:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (alias, database), values in stats:
+            lines.append(
+                f'{name}{{alias="{alias}",database="{database}"}} {values[stat]}'
+            )
+    return "\n".join(lines)
+
+
+def render_metrics():
+    rendered = [metric.render() for metric in REGISTRY] + [render_pool_stats()]
+    return "\n".join(rendered) + "\n"
+
+
+class QueryTimer:
+    """An execute wrapper counting and timing queries, logging the slow ones."""
+
+    def __init__(self, slow_query_seconds):
+        self.slow_query_seconds = slow_query_seconds
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slow_query_seconds:
+                slow_query_logger.warning(
+                    "Slow query (%.1f ms) on %s: %s",
+                    duration * 1000,
+                    context["connection"].alias,
+                    sql,
+                )
+
+
+class MetricsMiddleware:
+    """
+    Records request time, database time, query count and response size per
+    view into the histograms served on /metrics, and optionally reports them
+    in a Server-Timing header.
+
+    Metrics are kept per process. For streaming responses only the time until
+    the response is returned is measured and the size is not recorded.
+    """
+
+    def __init__(self, get_response):
+        options = settings.VOTING_METRICS
+        if not options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = options["SERVER_TIMING"]
+        self.slow_query_seconds = options["SLOW_QUERY_MS"] / 1000
+
+    def __call__(self, request):
+        timer = QueryTimer(self.slow_query_seconds)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        labels = (match.view_name if match else "unmatched", request.method)
+        request_duration.observe(labels, duration)
+        request_db_duration.observe(labels, timer.duration)
+        request_queries.observe(labels, timer.count)
+        if not response.streaming:
+            response_size.observe(labels, len(response.content))
+
+        if self.server_timing:
+            response["Server-Timing"] = (
+                f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries", '
+                f"total;dur={duration * 1000:.1f}"
+            )
+        return response
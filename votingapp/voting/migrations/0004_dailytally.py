@@ -0,0 +1,68 @@
+# Generated by Django 4.1.6 on 2026-10-17 05:55
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def backfill_tallies(apps, schema_editor):
+    Vote = apps.get_model("voting", "Vote")
+    DailyTally = apps.get_model("voting", "DailyTally")
+    rows = (
+        Vote.objects.values("date", "restaurant_id")
+        .annotate(
+            total_votes=Sum("weight"), num_voters=Count("voting_user", distinct=True)
+        )
+        .order_by()
+    )
+    DailyTally.objects.bulk_create(
+        (DailyTally(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0003_alter_vote_voting_user_alter_votinguser_username"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyTally",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("total_votes", models.FloatField(default=0)),
+                ("num_voters", models.PositiveIntegerField(default=0)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tallies",
+                        to="voting.restaurant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="dailytally",
+            index=models.Index(
+                fields=["date", "-total_votes", "-num_voters"],
+                name="voting_tally_ranking_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailytally",
+            constraint=models.UniqueConstraint(
+                fields=("date", "restaurant"), name="voting_tally_date_restaurant"
+            ),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
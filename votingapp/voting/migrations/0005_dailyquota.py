@@ -0,0 +1,59 @@
+# Generated by Django 4.1.6 on 2026-10-17 05:57
+
+from django.db import migrations, models
+from django.db.models import Count, F
+import django.db.models.deletion
+
+
+def backfill_quotas(apps, schema_editor):
+    Vote = apps.get_model("voting", "Vote")
+    DailyQuota = apps.get_model("voting", "DailyQuota")
+    rows = (
+        Vote.objects.values("voting_user_id", "date")
+        .annotate(used=Count("id"), limit=F("voting_user__limit"))
+        .order_by()
+    )
+    DailyQuota.objects.bulk_create(
+        (DailyQuota(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0004_dailytally"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyQuota",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("used", models.PositiveIntegerField(default=0)),
+                ("limit", models.PositiveIntegerField()),
+                (
+                    "voting_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quotas",
+                        to="voting.votinguser",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailyquota",
+            constraint=models.UniqueConstraint(
+                fields=("voting_user", "date"), name="voting_quota_user_date"
+            ),
+        ),
+        migrations.RunPython(backfill_quotas, migrations.RunPython.noop),
+    ]
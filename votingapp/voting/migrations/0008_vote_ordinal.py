@@ -0,0 +1,214 @@
+# Generated by Django 4.1.6 on 2026-10-17 08:12
+
+from django.db import migrations, models, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Min, Sum, Value, When
+import django.db.models.deletion
+
+USERS_PER_BATCH = 500
+DAYS_PER_BATCH = 31
+
+
+def ordinal_weight():
+    return Case(
+        When(ordinal=1, then=Value(1.0)),
+        When(ordinal=2, then=Value(0.5)),
+        default=Value(0.25),
+        output_field=FloatField(),
+    )
+
+
+def backfill_ordinals(apps, schema_editor):
+    """
+    Numbers every user's votes of a day in id order, a range of users per
+    transaction, so only the rows of those users are locked at a time.
+    """
+    VotingUser = apps.get_model("voting", "VotingUser")
+    connection = schema_editor.connection
+    bounds = VotingUser.objects.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return
+
+    sql = """
+        UPDATE voting_vote
+        SET ordinal = ranked.ordinal
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY voting_user_id, date ORDER BY id
+            ) AS ordinal
+            FROM voting_vote
+            WHERE {}
+        ) ranked
+        WHERE voting_vote.id = ranked.id
+    """
+    for start in range(bounds["first"], bounds["last"] + 1, USERS_PER_BATCH):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql.format("voting_user_id >= %s AND voting_user_id < %s"),
+                    [start, start + USERS_PER_BATCH],
+                )
+    # Votes cast by users whose batch was already done while this ran.
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.format(
+                    "voting_user_id IN (SELECT voting_user_id FROM voting_vote "
+                    "WHERE ordinal IS NULL)"
+                )
+            )
+
+
+def backfill_weights(apps, schema_editor):
+    Vote = apps.get_model("voting", "Vote")
+    Vote.objects.update(weight=ordinal_weight())
+
+
+def rebuild_changed_tallies(apps, schema_editor):
+    """
+    Rebuilds the tallies of days whose stored weights differ from the weights
+    of the ordinals, e.g. where racing votes of a user got the same weight.
+    """
+    Vote = apps.get_model("voting", "Vote")
+    DailyTally = apps.get_model("voting", "DailyTally")
+    alias = schema_editor.connection.alias
+    dates = list(
+        Vote.objects.alias(ordinal_weight=ordinal_weight())
+        .exclude(weight=F("ordinal_weight"))
+        .values_list("date", flat=True)
+        .distinct()
+        .order_by("date")
+    )
+    for start in range(0, len(dates), DAYS_PER_BATCH):
+        batch = dates[start : start + DAYS_PER_BATCH]
+        with transaction.atomic(using=alias):
+            DailyTally.objects.filter(date__in=batch).delete()
+            DailyTally.objects.bulk_create(
+                [
+                    DailyTally(**row)
+                    for row in Vote.objects.filter(date__in=batch)
+                    .values("date", "restaurant_id")
+                    .annotate(
+                        total_votes=Sum(ordinal_weight()),
+                        num_voters=Count("voting_user", distinct=True),
+                    )
+                    .order_by()
+                ],
+                batch_size=1000,
+            )
+
+
+def check_ordinals_not_null(apps, schema_editor):
+    """
+    A validated check lets PostgreSQL set ordinal NOT NULL without scanning the
+    table while holding its exclusive lock.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE voting_vote ADD CONSTRAINT voting_vote_ordinal_not_null "
+            "CHECK (ordinal IS NOT NULL) NOT VALID"
+        )
+        schema_editor.execute(
+            "ALTER TABLE voting_vote VALIDATE CONSTRAINT voting_vote_ordinal_not_null"
+        )
+
+
+def drop_ordinals_not_null_check(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE voting_vote DROP CONSTRAINT IF EXISTS "
+            "voting_vote_ordinal_not_null"
+        )
+
+
+class AddConstraintWithoutBlocking(migrations.AddConstraint):
+    """
+    On PostgreSQL, validates a check constraint and builds a unique constraint's
+    index while votes are written, taking the table's exclusive lock only
+    briefly to attach them. A failed concurrent build leaves an invalid index
+    that must be dropped before running the migration again.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        name = schema_editor.quote_name(self.constraint.name)
+        if isinstance(self.constraint, models.CheckConstraint):
+            schema_editor.execute(
+                f"{self.constraint.create_sql(model, schema_editor)} NOT VALID",
+                params=None,
+            )
+            schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+        else:
+            columns = ", ".join(
+                schema_editor.quote_name(model._meta.get_field(field).column)
+                for field in self.constraint.fields
+            )
+            schema_editor.execute(
+                f"CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})"
+            )
+            schema_editor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}"
+            )
+
+
+class Migration(migrations.Migration):
+    # The backfill commits in batches, and indexes are built concurrently.
+    atomic = False
+
+    dependencies = [
+        ("voting", "0007_apikey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vote",
+            name="ordinal",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="vote",
+            name="weight",
+            field=models.FloatField(null=True),
+        ),
+        migrations.RunPython(backfill_ordinals, backfill_weights),
+        migrations.RunPython(rebuild_changed_tallies, migrations.RunPython.noop),
+        migrations.RunPython(check_ordinals_not_null, drop_ordinals_not_null_check),
+        migrations.AlterField(
+            model_name="vote",
+            name="ordinal",
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.RunPython(drop_ordinals_not_null_check, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="vote",
+            name="weight",
+        ),
+        migrations.AlterField(
+            model_name="vote",
+            name="voting_user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="votes",
+                to="voting.votinguser",
+            ),
+        ),
+        AddConstraintWithoutBlocking(
+            model_name="vote",
+            constraint=models.UniqueConstraint(
+                fields=("voting_user", "date", "ordinal"),
+                name="voting_vote_user_date_ordinal",
+            ),
+        ),
+        AddConstraintWithoutBlocking(
+            model_name="vote",
+            constraint=models.CheckConstraint(
+                check=models.Q(("ordinal__gte", 1)),
+                name="voting_vote_ordinal_positive",
+            ),
+        ),
+    ]
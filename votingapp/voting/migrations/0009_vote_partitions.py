@@ -0,0 +1,25 @@
+# Generated by Django 4.1.6 on 2026-10-17 09:02
+
+from django.db import migrations
+
+from voting import partitions
+
+
+def partition_votes(apps, schema_editor):
+    if partitions.supports_partitions(schema_editor.connection):
+        partitions.convert(schema_editor.connection, partitioned=True)
+
+
+def unpartition_votes(apps, schema_editor):
+    if partitions.is_partitioned(schema_editor.connection):
+        partitions.convert(schema_editor.connection, partitioned=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0008_vote_ordinal"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_votes, unpartition_votes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.6 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0009_vote_partitions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactedDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("votes_deleted", models.PositiveBigIntegerField(default=0)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="vote",
+            index=models.Index(fields=["date", "id"], name="voting_vote_date_id_idx"),
+        ),
+    ]
@@ -1,4 +1,37 @@
-from django.db import models
+import hashlib
+import hmac
+import secrets
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+
+from django.db import connections, models, router, transaction
+from django.db.models import Case, Count, Exists, FloatField, OuterRef, Sum, Value, When
+from django.utils import timezone
+
+
+def calculate_vote_weight(total_count):
+    if not total_count:
+        return 1
+    elif total_count == 1:
+        return 0.5
+    else:
+        return 0.25
+
+
+def vote_weight(ordinal="ordinal"):
+    """calculate_vote_weight as an SQL expression of a vote's daily ordinal."""
+    return Case(
+        When(**{ordinal: 1}, then=Value(1.0)),
+        When(**{ordinal: 2}, then=Value(0.5)),
+        default=Value(0.25),
+        output_field=FloatField(),
+    )
+
+
+class VoteLimitExceeded(Exception):
+    pass
 
 
 class VotingUser(models.Model):
@@ -12,28 +45,547 @@ class VotingUser(models.Model):
 class Restaurant(models.Model):
     name = models.CharField(max_length=200)
 
-    def add_vote(self, total_votes, voting_user, voting_date):
-        def calculate_vote_weight(total_count):
-            if not total_count:
-                return 1
-            elif total_count == 1:
-                return 0.5
-            else:
-                return 0.25
-
-        self.votes.create(
-            voting_user=voting_user,
-            weight=calculate_vote_weight(total_votes),
-            date=voting_date,
+
+class VoteManager(models.Manager):
+    def cast(self, restaurant_id, voting_user_id, voting_date):
+        """
+        Records a vote and returns the claimed daily quota as (ordinal, limit).
+
+        The quota claim, the vote insert and the tally update are the only
+        statements on the happy path; the failure path issues extra queries to
+        tell which of the checks rejected the vote. Votes the shared counters
+        know to be over the limit are rejected without queries.
+        """
+        from voting.counters import shared_counters
+
+        if shared_counters.over_limit(voting_user_id, restaurant_id, voting_date):
+            raise VoteLimitExceeded
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            claimed = DailyQuota.objects.claim(
+                voting_user_id, restaurant_id, voting_date
+            )
+            if claimed is None:
+                if not VotingUser.objects.filter(pk=voting_user_id).exists():
+                    raise VotingUser.DoesNotExist
+                if not Restaurant.objects.filter(pk=restaurant_id).exists():
+                    raise Restaurant.DoesNotExist
+                raise VoteLimitExceeded
+            ordinal, limit = claimed
+            vote = self.create(
+                restaurant_id=restaurant_id,
+                voting_user_id=voting_user_id,
+                ordinal=ordinal,
+                date=voting_date,
+            )
+            DailyTally.objects.record_vote(vote)
+            if shared_counters.enabled:
+                transaction.on_commit(
+                    partial(
+                        shared_counters.record,
+                        voting_date,
+                        quotas={voting_user_id: claimed},
+                    ),
+                    using=using,
+                )
+        return ordinal, limit
+
+    def last_id(self, voting_date):
+        """Id of the day's latest vote, 0 if there is none; served by an index."""
+        return (
+            self.filter(date=voting_date).aggregate(last_id=models.Max("id"))["last_id"]
+            or 0
+        )
+
+    def bulk_cast(self, items, voting_date):
+        """
+        Records a batch of (voting_user_id, restaurant_id) votes in submission
+        order and returns one result dict per item.
+        """
+        user_ids = {user_id for user_id, _ in items}
+        restaurant_ids = {restaurant_id for _, restaurant_id in items}
+        users = VotingUser.objects.in_bulk(user_ids)
+        known_restaurants = set(
+            Restaurant.objects.filter(pk__in=restaurant_ids).values_list(
+                "pk", flat=True
+            )
         )
 
+        from voting.counters import shared_counters
+
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            DailyQuota.objects.bulk_create(
+                [
+                    DailyQuota(
+                        voting_user=user, date=voting_date, used=0, limit=user.limit
+                    )
+                    for user in users.values()
+                ],
+                ignore_conflicts=True,
+            )
+            quotas = {
+                quota.voting_user_id: quota
+                for quota in DailyQuota.objects.select_for_update().filter(
+                    voting_user_id__in=users, date=voting_date
+                )
+            }
+            voted = set(
+                self.filter(
+                    date=voting_date,
+                    voting_user_id__in=users,
+                    restaurant_id__in=known_restaurants,
+                )
+                .values_list("voting_user_id", "restaurant_id")
+                .distinct()
+            )
+
+            results = []
+            votes = []
+            totals = {}
+            for user_id, restaurant_id in items:
+                if user_id not in users:
+                    results.append(
+                        {
+                            "accepted": False,
+                            "detail": "User corresponding to user_id not found.",
+                        }
+                    )
+                    continue
+                if restaurant_id not in known_restaurants:
+                    results.append(
+                        {"accepted": False, "detail": "Restaurant not found."}
+                    )
+                    continue
+                quota = quotas[user_id]
+                quota.limit = users[user_id].limit
+                if quota.used >= quota.limit:
+                    results.append(
+                        {
+                            "accepted": False,
+                            "detail": "You have exceeded your voting limit for today.",
+                        }
+                    )
+                    continue
+
+                weight = calculate_vote_weight(quota.used)
+                quota.used += 1
+                votes.append(
+                    Vote(
+                        restaurant_id=restaurant_id,
+                        voting_user_id=user_id,
+                        ordinal=quota.used,
+                        date=voting_date,
+                    )
+                )
+                total_votes, num_voters = totals.get(restaurant_id, (0, 0))
+                if (user_id, restaurant_id) not in voted:
+                    voted.add((user_id, restaurant_id))
+                    num_voters += 1
+                totals[restaurant_id] = (total_votes + weight, num_voters)
+                results.append(
+                    {
+                        "accepted": True,
+                        "weight": weight,
+                        "remaining_limit": quota.limit - quota.used,
+                    }
+                )
+
+            self.bulk_create(votes)
+            DailyQuota.objects.bulk_update(quotas.values(), ["used", "limit"])
+            DailyTally.objects.add_totals(voting_date, totals)
+            if shared_counters.enabled:
+                transaction.on_commit(
+                    partial(
+                        shared_counters.record,
+                        voting_date,
+                        quotas={
+                            user_id: (quota.used, quota.limit)
+                            for user_id, quota in quotas.items()
+                        },
+                    ),
+                    using=using,
+                )
+        return results
+
 
 class Vote(models.Model):
+    """
+    A vote, stored with its position among the user's votes of the day. The
+    weight follows from the ordinal, and the unique ordinal per user and day
+    keeps concurrent writers from recording the same vote of a quota twice.
+    """
+
     restaurant = models.ForeignKey(
         Restaurant, on_delete=models.CASCADE, related_name="votes"
     )
+    # Lookups by user are served by the unique constraint's index.
     voting_user = models.ForeignKey(
-        VotingUser, on_delete=models.CASCADE, related_name="votes"
+        VotingUser, on_delete=models.CASCADE, related_name="votes", db_index=False
     )
-    weight = models.FloatField()
+    ordinal = models.PositiveSmallIntegerField()
     date = models.DateField()
+
+    objects = VoteManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["voting_user", "date", "ordinal"],
+                name="voting_vote_user_date_ordinal",
+            ),
+            models.CheckConstraint(
+                check=models.Q(ordinal__gte=1), name="voting_vote_ordinal_positive"
+            ),
+        ]
+        indexes = [models.Index(fields=["date", "id"], name="voting_vote_date_id_idx")]
+
+    @property
+    def weight(self):
+        return calculate_vote_weight(self.ordinal - 1)
+
+
+class DailyQuotaManager(models.Manager):
+    def claim(self, voting_user_id, restaurant_id, voting_date):
+        """
+        Atomically takes the next vote of the user's daily quota.
+
+        Returns (ordinal, limit) of the claimed vote, or None when the user or
+        the restaurant does not exist or the limit has been reached. Concurrent
+        claims for the same user and date serialize on the quota row, so every
+        vote gets its own ordinal.
+        """
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO voting_dailyquota (voting_user_id, date, used, "limit")
+                SELECT u.id, %s, 1, u."limit"
+                FROM voting_votinguser u
+                WHERE u.id = %s
+                  AND u."limit" > 0
+                  AND EXISTS (SELECT 1 FROM voting_restaurant r WHERE r.id = %s)
+                ON CONFLICT (voting_user_id, date) DO UPDATE
+                SET used = voting_dailyquota.used + 1, "limit" = excluded."limit"
+                WHERE voting_dailyquota.used < excluded."limit"
+                RETURNING used, "limit"
+                """,
+                [voting_date, voting_user_id, restaurant_id],
+            )
+            return cursor.fetchone()
+
+
+class DailyQuota(models.Model):
+    """Number of votes a user has cast on a day, claimed atomically per vote."""
+
+    voting_user = models.ForeignKey(
+        VotingUser, on_delete=models.CASCADE, related_name="quotas"
+    )
+    date = models.DateField()
+    used = models.PositiveIntegerField(default=0)
+    limit = models.PositiveIntegerField()
+
+    objects = DailyQuotaManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["voting_user", "date"], name="voting_quota_user_date"
+            )
+        ]
+
+
+class DailyTallyManager(models.Manager):
+    def changed(self, dates=None):
+        """Drops cached winners of the given dates (all by default)."""
+        from voting.winners import invalidate_winners
+
+        # Right away for reads in this transaction, and again on commit for
+        # entries other requests cached from the data before the commit.
+        invalidate_winners(dates)
+        transaction.on_commit(
+            lambda: invalidate_winners(dates), using=router.db_for_write(self.model)
+        )
+
+    def record_vote(self, vote):
+        """
+        Adds a freshly inserted vote to its restaurant's tally for the day and
+        returns the tally's new (total_votes, num_voters).
+        """
+        using = router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO voting_dailytally (date, restaurant_id, total_votes, num_voters)
+                SELECT v.date,
+                       v.restaurant_id,
+                       CASE v.ordinal WHEN 1 THEN 1.0 WHEN 2 THEN 0.5 ELSE 0.25 END,
+                       CASE WHEN EXISTS (
+                           SELECT 1 FROM voting_vote o
+                           WHERE o.voting_user_id = v.voting_user_id
+                             AND o.date = %s
+                             AND o.restaurant_id = v.restaurant_id
+                             AND o.id <> v.id
+                       ) THEN 0 ELSE 1 END
+                FROM voting_vote v
+                WHERE v.id = %s AND v.date = %s
+                ON CONFLICT (date, restaurant_id) DO UPDATE
+                SET total_votes = voting_dailytally.total_votes + excluded.total_votes,
+                    num_voters = voting_dailytally.num_voters + excluded.num_voters
+                RETURNING total_votes, num_voters
+                """,
+                # The dates let PostgreSQL read a single vote partition.
+                [vote.date, vote.pk, vote.date],
+            )
+            tally = cursor.fetchone()
+        self.counted(vote.date, {vote.restaurant_id: tally}, using)
+        self.changed([vote.date])
+        return tally
+
+    def add_totals(self, voting_date, totals):
+        """Adds {restaurant_id: (total_votes, num_voters)} to the day's tallies."""
+        if not totals:
+            return
+        using = router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO voting_dailytally (date, restaurant_id, total_votes, num_voters)
+                VALUES {", ".join(["(%s, %s, %s, %s)"] * len(totals))}
+                ON CONFLICT (date, restaurant_id) DO UPDATE
+                SET total_votes = voting_dailytally.total_votes + excluded.total_votes,
+                    num_voters = voting_dailytally.num_voters + excluded.num_voters
+                RETURNING restaurant_id, total_votes, num_voters
+                """,
+                [
+                    value
+                    for restaurant_id, (total_votes, num_voters) in totals.items()
+                    for value in (voting_date, restaurant_id, total_votes, num_voters)
+                ],
+            )
+            tallies = {
+                restaurant_id: (total_votes, num_voters)
+                for restaurant_id, total_votes, num_voters in cursor.fetchall()
+            }
+        self.counted(voting_date, tallies, using)
+        self.changed([voting_date])
+
+    def counted(self, voting_date, tallies, using):
+        """
+        Passes the day's committed tallies on to the shared counters, before
+        cached winners are dropped so they are not cached from older counts.
+        """
+        from voting.counters import shared_counters
+
+        if shared_counters.enabled:
+            transaction.on_commit(
+                partial(shared_counters.record, voting_date, tallies=tallies),
+                using=using,
+            )
+
+    def winners_between(self, date_from, date_to, size):
+        """
+        Yields (date, winner) for the top `size` restaurants of every day in the
+        range, ordered by date and rank, from a single windowed query read
+        through a server-side cursor.
+        """
+        with connections[self.db].chunked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT date, id, name, total_votes, num_voters
+                FROM (
+                    SELECT t.date, r.id, r.name, t.total_votes, t.num_voters,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY t.date
+                               ORDER BY t.total_votes DESC, t.num_voters DESC
+                           ) AS position
+                    FROM voting_dailytally t
+                    JOIN voting_restaurant r ON r.id = t.restaurant_id
+                    WHERE t.date BETWEEN %s AND %s
+                ) ranked
+                WHERE position <= %s
+                ORDER BY date, position
+                """,
+                [date_from, date_to, size],
+            )
+            while rows := cursor.fetchmany(1000):
+                for voting_date, *winner in rows:
+                    if isinstance(voting_date, str):
+                        voting_date = date.fromisoformat(voting_date)
+                    yield voting_date, dict(
+                        zip(("id", "name", "total_votes", "num_voters"), winner)
+                    )
+
+    def rebuild(self, dates=None):
+        """
+        Replaces the tallies of the given dates (all by default) from raw votes.
+        Tallies of days without raw votes are kept.
+        """
+        from voting.counters import shared_counters
+
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            self.changed(dates)
+            # Rebuilt tallies may be lower than the counters merged so far.
+            transaction.on_commit(shared_counters.invalidate, using=using)
+            deleted, _ = self.with_votes(dates).delete()
+            created = self.bulk_create(
+                (DailyTally(**row) for row in self.from_votes(dates).iterator()),
+                batch_size=1000,
+            )
+        return deleted, len(created)
+
+    def with_votes(self, dates=None):
+        """
+        Tallies of the given dates (all by default) that have raw votes to
+        rebuild them from: days that were compacted or whose votes were
+        detached with their partition are left out.
+        """
+        tallies = self.exclude(date__in=CompactedDay.objects.values("date")).filter(
+            Exists(Vote.objects.filter(date=OuterRef("date")))
+        )
+        if dates is not None:
+            tallies = tallies.filter(date__in=dates)
+        return tallies
+
+    def from_votes(self, dates=None):
+        """Aggregates raw votes the same way the tallies are maintained."""
+        votes = Vote.objects.exclude(date__in=CompactedDay.objects.values("date"))
+        if dates is not None:
+            votes = votes.filter(date__in=dates)
+        return (
+            votes.values("date", "restaurant_id")
+            .annotate(
+                total_votes=Sum(vote_weight()),
+                num_voters=Count("voting_user", distinct=True),
+            )
+            .order_by()
+        )
+
+
+class DailyTally(models.Model):
+    """Running per-day totals of a restaurant's votes, kept in sync on every vote."""
+
+    date = models.DateField()
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="tallies"
+    )
+    total_votes = models.FloatField(default=0)
+    num_voters = models.PositiveIntegerField(default=0)
+
+    objects = DailyTallyManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "restaurant"], name="voting_tally_date_restaurant"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["date", "-total_votes", "-num_voters"],
+                name="voting_tally_ranking_idx",
+            )
+        ]
+
+
+class CompactedDay(models.Model):
+    """
+    A day whose raw votes are (being) deleted after folding them into its
+    tallies, which stay the only record of the day's votes.
+    """
+
+    date = models.DateField(unique=True)
+    votes_deleted = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+
+class VersionStampManager(models.Manager):
+    def current(self, name):
+        """Returns (version, updated_at) of the stamp; (0, None) before any bump."""
+        row = self.filter(name=name).values_list("version", "updated_at").first()
+        return row or (0, None)
+
+    def bump(self, name):
+        connection = connections[router.db_for_write(self.model)]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO voting_versionstamp (name, version, updated_at)
+                VALUES (%s, 1, %s)
+                ON CONFLICT (name) DO UPDATE
+                SET version = voting_versionstamp.version + 1,
+                    updated_at = excluded.updated_at
+                """,
+                [name, now],
+            )
+
+
+class VersionStamp(models.Model):
+    """A counter bumped whenever the data it is named after changes."""
+
+    # Restaurants and their names, which the catalog and the winners show.
+    CATALOG = "restaurants"
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    objects = VersionStampManager()
+
+
+class ImportProgress(models.Model):
+    """Number of rows of an import source that have been committed."""
+
+    source = models.CharField(max_length=500, unique=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ApiKeyManager(models.Manager):
+    def issue(self, user, name=""):
+        """Creates a key for the user and returns it with its only plain-text copy."""
+        prefix = secrets.token_hex(4)
+        key = f"{prefix}.{secrets.token_urlsafe(32)}"
+        api_key = self.create(
+            user=user, name=name, prefix=prefix, hashed_key=ApiKey.hash(key)
+        )
+        return api_key, key
+
+    def verify(self, key, digest):
+        prefix = key.partition(".")[0]
+        api_key = (
+            self.select_related("user")
+            .filter(prefix=prefix, revoked_at__isnull=True)
+            .first()
+        )
+        if api_key is None or not hmac.compare_digest(api_key.hashed_key, digest):
+            return None
+        return api_key
+
+
+class ApiKey(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="api_keys"
+    )
+    name = models.CharField(max_length=120, blank=True)
+    prefix = models.CharField(max_length=16, unique=True)
+    hashed_key = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ApiKeyManager()
+
+    @staticmethod
+    def hash(key):
+        return hmac.new(
+            settings.SECRET_KEY.encode(), key.encode(), hashlib.sha256
+        ).hexdigest()
+
+    def revoke(self):
+        from voting.authentication import verified_keys
+
+        self.revoked_at = timezone.now()
+        self.save(update_fields=["revoked_at"])
+        verified_keys.discard(self.hashed_key)
@@ -0,0 +1,34 @@
+"""
+The drf_spectacular annotations of the views. Without the API docs
+(VOTINGAPP_DOCS=0) they are no-ops, so drf_spectacular is never imported.
+"""
+from django.conf import settings
+
+if settings.SERVE_API_DOCS:
+    from drf_spectacular.types import OpenApiTypes
+    from drf_spectacular.utils import (
+        extend_schema,
+        extend_schema_view,
+        OpenApiParameter,
+        OpenApiExample,
+    )
+else:
+
+    def extend_schema(*args, **kwargs):
+        return lambda view: view
+
+    extend_schema_view = extend_schema
+
+    class OpenApiTypes:
+        DATE = "date"
+        INT = "int"
+        STR = "str"
+
+    class OpenApiParameter:
+        PATH = "path"
+        QUERY = "query"
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    OpenApiExample = OpenApiParameter
@@ -0,0 +1,142 @@
+from django.db import connections
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+MAX_PAGE_SIZE = 100
+
+
+def estimated_count(queryset):
+    """Returns the planner's row estimate of the table, or an exact count."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return queryset.count()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # Tables that were never analyzed report -1 (or 0 before PostgreSQL 14).
+    if row is None or row[0] <= 0:
+        return queryset.count()
+    return int(row[0])
+
+
+class NumberedPagination(PageNumberPagination):
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the primary key, newest first.
+
+    Pages are fetched with `WHERE id < last seen id`, so deep pages cost as much
+    as the first one, and no COUNT(*) runs unless the client asks for
+    `count=exact` or `count=estimate`.
+    """
+
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        counting = request.query_params.get(self.count_query_param)
+        if counting == "exact":
+            self.count = queryset.count()
+        elif counting == "estimate":
+            self.count = estimated_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+            response.data.move_to_end("count", last=False)
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "count": {"type": "integer", "example": 123},
+            **response_schema["properties"],
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include the total number of results, counted "
+                "exactly or estimated from table statistics",
+                "schema": {"type": "string", "enum": ["exact", "estimate"]},
+            }
+        ]
+
+
+class SelectablePagination(BasePagination):
+    """
+    Page number pagination by default; cursor pagination for views that set
+    `pagination_mode = "cursor"` or requests with `pagination=cursor` or a
+    `cursor` parameter.
+    """
+
+    mode_query_param = "pagination"
+
+    def __init__(self):
+        self.numbered = NumberedPagination()
+        self.keyset = KeysetPagination()
+        self.paginator = self.numbered
+
+    def use_cursor(self, request, view):
+        mode = request.query_params.get(
+            self.mode_query_param, getattr(view, "pagination_mode", "page")
+        )
+        return (
+            mode == "cursor" or self.keyset.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = (
+            self.keyset if self.use_cursor(request, view) else self.numbered
+        )
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.numbered.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = {
+            parameter["name"]: parameter
+            for paginator in (self.numbered, self.keyset)
+            for parameter in paginator.get_schema_operation_parameters(view)
+        }
+        parameters[self.mode_query_param] = {
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Pagination style; cursor pages stay fast however deep they go",
+            "schema": {"type": "string", "enum": ["page", "cursor"]},
+        }
+        return list(parameters.values())
+
+    def get_results(self, data):
+        return data["results"]
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
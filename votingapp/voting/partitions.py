@@ -0,0 +1,223 @@
+"""
+PostgreSQL range partitioning of the vote table by date.
+
+voting_vote is a partitioned table with one partition per month or day
+(VOTING_PARTITIONS["INTERVAL"]) and a default partition that catches votes
+outside the created ranges. Queries filtering on a date only read the
+partition of that date.
+"""
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
+
+TABLE = "voting_vote"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+BOUNDS_RE = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+def supports_partitions(connection):
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned(connection):
+    if not supports_partitions(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s))",
+            [TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def interval_range(day, interval):
+    """Returns the [start, end) dates of the partition interval containing day."""
+    if interval == "day":
+        return day, day + timedelta(days=1)
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def horizon(interval, ahead):
+    """Returns the first day of the interval `ahead` intervals after today's."""
+    day = date.today()
+    for _ in range(ahead):
+        day = interval_range(day, interval)[1]
+    return day
+
+
+def partition_name(start, interval):
+    suffix = f"{start:%Y_%m}" if interval == "month" else f"{start:%Y_%m_%d}"
+    return f"{TABLE}_p{suffix}"
+
+
+def partitions(connection):
+    """Returns [(name, start, end)] of the attached range partitions by start."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        match = BOUNDS_RE.search(bound)
+        if match:
+            start, end = map(date.fromisoformat, match.groups())
+            result.append((name, start, end))
+    return sorted(result, key=lambda partition: partition[1])
+
+
+def create_partitions(connection, first_day, last_day, interval=None):
+    """
+    Creates the missing partitions covering first_day..last_day and returns
+    their names. Votes of those days that landed in the default partition are
+    moved into the new partitions.
+    """
+    interval = interval or settings.VOTING_PARTITIONS["INTERVAL"]
+    existing = partitions(connection)
+    quote = connection.ops.quote_name
+    created = []
+    start, end = interval_range(first_day, interval)
+    while start <= last_day:
+        overlaps = any(s < end and start < e for _, s, e in existing)
+        if not overlaps:
+            name = partition_name(start, interval)
+            with connection.cursor() as cursor:
+                # A partition can't be created while the default partition
+                # holds rows of its range; take them out first.
+                cursor.execute(
+                    f"ALTER TABLE {quote(TABLE)} "
+                    f"DETACH PARTITION {quote(DEFAULT_PARTITION)}"
+                )
+                cursor.execute(
+                    f"CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [start, end],
+                )
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} "
+                    "WHERE date >= %s AND date < %s RETURNING *) "
+                    f"INSERT INTO {quote(name)} SELECT * FROM moved",
+                    [start, end],
+                )
+                cursor.execute(
+                    f"ALTER TABLE {quote(TABLE)} ATTACH PARTITION "
+                    f"{quote(DEFAULT_PARTITION)} DEFAULT"
+                )
+            created.append(name)
+        start, end = interval_range(end, interval)
+    return created
+
+
+def detach_partitions(connection, before, drop=False):
+    """
+    Detaches the partitions that end on or before the given date and returns
+    their [(name, {date: number of votes})]. Detached partitions stay as
+    standalone tables for archiving unless drop is set.
+    """
+    quote = connection.ops.quote_name
+    detached = []
+    with connection.cursor() as cursor:
+        for name, _, end in partitions(connection):
+            if end > before:
+                break
+            cursor.execute(f"SELECT date, COUNT(*) FROM {quote(name)} GROUP BY date")
+            votes = dict(cursor.fetchall())
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+            detached.append((name, votes))
+    return detached
+
+
+def convert(connection, partitioned, interval=None):
+    """
+    Recreates the vote table as a partitioned table (or back as a plain one),
+    keeping its rows, identity sequence, constraints and indexes. Runs in the
+    caller's transaction and locks the table while rows are copied.
+    """
+    quote = connection.ops.quote_name
+    old = f"{TABLE}_unconverted"
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}")
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')
+            """,
+            [old],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+              )
+            """,
+            [old],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            """,
+            [old],
+        )
+        columns = cursor.fetchone()[0]
+
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old)} INCLUDING DEFAULTS "
+            "INCLUDING CONSTRAINTS INCLUDING IDENTITY)"
+            + (" PARTITION BY RANGE (date)" if partitioned else "")
+        )
+        if partitioned:
+            cursor.execute(
+                f"CREATE TABLE {quote(DEFAULT_PARTITION)} "
+                f"PARTITION OF {quote(TABLE)} DEFAULT"
+            )
+            cursor.execute(f"SELECT MIN(date) FROM {quote(old)}")
+            first_day = cursor.fetchone()[0] or date.today()
+            options = settings.VOTING_PARTITIONS
+            interval = interval or options["INTERVAL"]
+            last_day = horizon(interval, options["PRECREATE"])
+            create_partitions(connection, first_day, last_day, interval)
+
+        cursor.execute(
+            f"INSERT INTO {quote(TABLE)} ({columns}) "
+            f"SELECT {columns} FROM {quote(old)}"
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {quote(old)}), 0) + 1, false)",
+            [TABLE],
+        )
+        cursor.execute(f"DROP TABLE {quote(old)}")
+
+        for name, kind, definition in constraints:
+            if kind == "p":
+                # Unique keys of a partitioned table must contain the date.
+                definition = (
+                    "PRIMARY KEY (id, date)" if partitioned else "PRIMARY KEY (id)"
+                )
+            cursor.execute(
+                f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} {definition}"
+            )
+        for definition in indexes:
+            definition = definition.replace(" ON ONLY ", " ON ")
+            cursor.execute(definition.replace(old, TABLE))
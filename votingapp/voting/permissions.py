@@ -0,0 +1,86 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import DjangoModelPermissions
+
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+GLOBAL_VERSION_KEY = "voting:perms:version"
+
+
+def permission_cache():
+    return caches[settings.VOTING_PERMISSION_CACHE["ALIAS"]]
+
+
+def user_version_key(user_id):
+    return f"voting:perms:version:{user_id}"
+
+
+def bump_permission_version(user_ids=None):
+    """Invalidates cached permissions of the given users, or of everyone."""
+    keys = (
+        [GLOBAL_VERSION_KEY]
+        if user_ids is None
+        else [user_version_key(user_id) for user_id in user_ids]
+    )
+    permission_cache().set_many(dict.fromkeys(keys, uuid.uuid4().hex), None)
+
+
+def cached_permissions(user):
+    cache = permission_cache()
+    version_keys = [GLOBAL_VERSION_KEY, user_version_key(user.pk)]
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            # A missing version may have been evicted; never reuse old entries.
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+
+    key = "voting:perms:{}:{}:{}".format(
+        user.pk, versions[GLOBAL_VERSION_KEY], versions[version_keys[1]]
+    )
+    permissions = cache.get(key)
+    if permissions is None:
+        # ModelBackend memoizes permissions on the user object, which may be
+        # older than the current version (e.g. users cached by API key auth).
+        for attr in ("_perm_cache", "_user_perm_cache", "_group_perm_cache"):
+            user.__dict__.pop(attr, None)
+        permissions = user.get_all_permissions()
+        cache.set(key, permissions, settings.VOTING_PERMISSION_CACHE["TIMEOUT"])
+    return permissions
+
+
+class CachedDjangoModelPermissions(DjangoModelPermissions):
+    """
+    DjangoModelPermissions that resolves a user's permissions from a shared
+    cache instead of the database on every request.
+
+    Cached permission sets are keyed by versions that are replaced whenever
+    user, group or permission relations change (see voting.signals), so the
+    allow/deny decisions are the same as with DjangoModelPermissions.
+    """
+
+    def has_permission(self, request, view):
+        if getattr(view, "_ignore_model_permissions", False):
+            return True
+
+        if not request.user or (
+            not request.user.is_authenticated and self.authenticated_users_only
+        ):
+            return False
+
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return self.has_perms(request.user, perms)
+
+    def has_perms(self, user, perms):
+        if not perms:
+            return True
+        if list(settings.AUTHENTICATION_BACKENDS) != [MODEL_BACKEND]:
+            # Other backends may decide per permission, keep their behaviour.
+            return user.has_perms(perms)
+        if not user.is_active:
+            return False
+        if user.is_superuser:
+            return True
+        return set(perms) <= cached_permissions(user)
@@ -0,0 +1,214 @@
+"""
+An in-process pool of database connections, used by the PostgreSQL backend in
+voting.backends.postgresql. Every process keeps one pool per database it
+connects to; threads (and the threads ASGI runs sync code in) check
+connections out of it instead of opening their own.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+# psycopg2's connection.closed of an open connection and its idle
+# transaction_status.
+OPEN = 0
+IDLE = 0
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Keeps up to max_size connections open, reusing the most recently returned
+    one first. getconn(connect) opens a new one with connect() while the pool
+    is not full. Connections idle for longer than max_idle seconds are closed,
+    except for the last min_size. A connection idle for longer than check_idle
+    seconds is pinged before it is handed out again, and discarded if that
+    fails. When all connections are in use, getconn() waits up to timeout
+    seconds for one to be returned.
+    """
+
+    def __init__(self, min_size, max_size, max_idle, timeout, check_idle):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._available = threading.Condition()
+        self._stats = dict.fromkeys(
+            ("opened", "closed", "checkouts", "waits", "timeouts", "wait_seconds"), 0
+        )
+
+    def getconn(self, connect):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, idle_since = self._checkout(deadline)
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self._forget(None)
+                    raise
+                with self._available:
+                    self._stats["opened"] += 1
+                return connection
+            if time.monotonic() - idle_since < self.check_idle or self._ping(
+                connection
+            ):
+                return connection
+            self._forget(connection)
+
+    def putconn(self, connection):
+        if self._reset(connection):
+            with self._available:
+                self._idle.append((connection, time.monotonic()))
+                expired = self._expire()
+                self._available.notify()
+            self._close(expired)
+        else:
+            self._forget(connection)
+
+    def stats(self):
+        with self._available:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.max_size,
+            }
+
+    def close(self):
+        with self._available:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        self._close(idle)
+
+    def _checkout(self, deadline):
+        """
+        Returns an idle (connection, idle since), or (None, None) when a new
+        connection may be opened in its place.
+        """
+        with self._available:
+            self._stats["checkouts"] += 1
+            waited_from = None
+            while True:
+                if self._idle:
+                    checked_out = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    checked_out = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout} "
+                        f"seconds, all {self.max_size} are in use."
+                    )
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    self._stats["waits"] += 1
+                self._waiting += 1
+                self._available.wait(remaining)
+                self._waiting -= 1
+            if waited_from is not None:
+                self._stats["wait_seconds"] += time.monotonic() - waited_from
+            return checked_out
+
+    def _expire(self):
+        """Takes the connections idle for too long out of the pool."""
+        expired = []
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _forget(self, connection):
+        """Frees the slot of a connection that is broken or failed to open."""
+        with self._available:
+            self._size -= 1
+            self._available.notify()
+        if connection is not None:
+            self._close([connection])
+
+    def _close(self, connections):
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        if connections:
+            with self._available:
+                self._stats["closed"] += len(connections)
+
+    @staticmethod
+    def _reset(connection):
+        """Ends any open transaction; returns whether the connection is reusable."""
+        if connection.closed != OPEN:
+            return False
+        try:
+            if connection.info.transaction_status != IDLE:
+                connection.rollback()
+            return connection.info.transaction_status == IDLE
+        except Exception:
+            return False
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+
+def get_pool(alias, database, options):
+    """Returns this process's pool for a database, creating it on first use."""
+    key = alias, database
+    with _pools_lock:
+        pool = _pools.get(key)
+        # A forked process must not share its parent's connections.
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                min_size=options.get("MIN_SIZE", 1),
+                max_size=options.get("MAX_SIZE", 10),
+                max_idle=options.get("MAX_IDLE", 300),
+                timeout=options.get("TIMEOUT", 5),
+                check_idle=options.get("CHECK_IDLE", 30),
+            )
+        return pool
+
+
+def pools():
+    """Returns {(alias, database): pool} of this process."""
+    with _pools_lock:
+        return {key: pool for key, pool in _pools.items() if pool.pid == os.getpid()}
+
+
+def close_pools():
+    """Closes the idle connections of every pool of this process."""
+    for pool in pools().values():
+        pool.close()
@@ -0,0 +1,76 @@
+"""
+Routes the reads of a view to the replica database while the view allows it.
+Views opt in per action (see voting.viewsets.ReplicaReadsMixin), and clients
+that wrote within the last VOTING_REPLICA["STICKY_SECONDS"] keep reading from
+the primary, so they see their own writes despite replication lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def routing_scope():
+    """Reads go to the primary until read_from_replica() is called in the scope."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica():
+    if settings.VOTING_REPLICA["ENABLED"]:
+        _replica_reads.set(True)
+
+
+def reading_from_replica():
+    return _replica_reads.get()
+
+
+def replica_chunks(chunks):
+    """Produces the chunks of a streaming response reading from the replica."""
+    chunks = iter(chunks)
+    done = object()
+    while True:
+        with routing_scope():
+            read_from_replica()
+            chunk = next(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def sticky_key(user):
+    return f"voting:replica:wrote:{user.pk}"
+
+
+def record_write(user):
+    seconds = settings.VOTING_REPLICA["STICKY_SECONDS"]
+    if seconds and user.is_authenticated:
+        cache.set(sticky_key(user), True, seconds)
+
+
+def wrote_recently(user):
+    return user.is_authenticated and cache.get(sticky_key(user), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return REPLICA if _replica_reads.get() else None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == REPLICA else None
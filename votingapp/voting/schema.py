@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import drf_spectacular
+from django.conf import settings
+from django.http import HttpResponse
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from voting.conditional import conditional
+
+
+class ApiKeyAuthenticationScheme(OpenApiAuthenticationExtension):
+    target_class = "voting.authentication.ApiKeyAuthentication"
+    name = "apiKeyAuth"
+
+    def get_security_definition(self, auto_schema):
+        return {
+            "type": "apiKey",
+            "in": "header",
+            "name": "Authorization",
+            "description": 'API key prefixed with "Api-Key ", e.g. "Api-Key abcd1234.secret"',
+        }
+
+
+# The schema is generated from the code, so it is generated once per code
+# version: on the first request or by the build_schema command, kept in memory
+# and in a file that other processes started from the same code read instead.
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """A hash of the project's Python sources and the schema generator version."""
+    digest = hashlib.sha1(drf_spectacular.__version__.encode())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    for package in ("voting", "votingapp"):
+        for path in sorted((Path(settings.BASE_DIR) / package).rglob("*.py")):
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(renderer):
+    return Path(settings.API_SCHEMA_DIR) / f"openapi-{code_version()}.{renderer.format}"
+
+
+def generate_schema(renderer):
+    generator = SpectacularAPIView.generator_class()
+    schema = generator.get_schema(request=None, public=True)
+    return renderer.render(schema, renderer_context={})
+
+
+def get_schema(renderer):
+    """Returns the rendered schema from memory, the schema file or the generator."""
+    path = schema_path(renderer)
+    with _schemas_lock:
+        content = _schemas.get(path)
+        if content is None:
+            try:
+                content = path.read_bytes()
+            except FileNotFoundError:
+                content = generate_schema(renderer)
+                write_schema(path, content)
+            _schemas[path] = content
+    return content
+
+
+def write_schema(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """Serves the schema generated once per code version, validated by an ETag."""
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        return conditional(
+            request,
+            lambda: HttpResponse(
+                get_schema(renderer), content_type=request.accepted_media_type
+            ),
+            etag=f"schema-{code_version()}-{renderer.format}",
+            public=True,
+            no_cache=True,
+        )
@@ -16,3 +16,8 @@ class RestaurantSerializer(serializers.ModelSerializer):
 
 class VoteSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
+
+
+class BulkVoteSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField(min_value=1)
+    restaurant_id = serializers.IntegerField(min_value=1)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from voting.counters import shared_counters
+from voting.models import DailyTally, Restaurant, VersionStamp, VotingUser
+from voting.permissions import bump_permission_version
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        bump_permission_version([instance.pk])
+    elif pk_set is not None:
+        bump_permission_version(pk_set)
+    else:
+        # e.g. group.user_set.clear() does not tell which users it affected
+        bump_permission_version()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_permission_version()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def permission_holder_deleted(sender, **kwargs):
+    bump_permission_version()
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, created=False, **kwargs):
+    # Winners include restaurant names; new restaurants have no votes yet.
+    if not created:
+        DailyTally.objects.changed()
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def catalog_changed(sender, **kwargs):
+    VersionStamp.objects.bump(VersionStamp.CATALOG)
+    shared_counters.catalog_changed()
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=VotingUser)
+def counted_object_deleted(sender, **kwargs):
+    # The shared counters would still reject votes for it as over the limit.
+    shared_counters.invalidate()
+
+
+@receiver(post_save, sender=VotingUser)
+def voting_user_saved(sender, instance, created, **kwargs):
+    if not created:
+        shared_counters.set_limit(instance.pk, instance.limit)
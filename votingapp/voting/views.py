@@ -1,3 +1,33 @@
-from django.shortcuts import render
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from voting.metrics import render_metrics
+
+
+@require_GET
+def metrics(request):
+    """Serves the request metrics in the Prometheus text format."""
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4")
+
+
+@never_cache
+@require_GET
+def healthz(request):
+    """Liveness probe: the process serves requests. Touches nothing else."""
+    return HttpResponse("ok", content_type="text/plain")
+
+
+@never_cache
+@require_GET
+def readyz(request):
+    """Readiness probe: the process serves requests and reaches the database."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError:
+        return HttpResponse(
+            "database unavailable", status=503, content_type="text/plain"
+        )
+    return HttpResponse("ok", content_type="text/plain")
@@ -1,36 +1,155 @@
-from datetime import date
+import json
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
 
-from django.db.models import Sum, Count, Q
-from django.shortcuts import get_object_or_404
-from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import (
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from voting.models import (
+    DailyTally,
+    Restaurant,
+    VersionStamp,
+    Vote,
+    VoteLimitExceeded,
+    VotingUser,
+)
+from .conditional import conditional
+from .exports import export_rows, stream_csv, stream_ndjson
+from .openapi import (
     extend_schema,
     extend_schema_view,
     OpenApiParameter,
     OpenApiExample,
+    OpenApiTypes,
 )
-from rest_framework import viewsets, status
-from rest_framework.decorators import action
-from rest_framework.exceptions import APIException
-from rest_framework.response import Response
+from .renderers import CSVRenderer, NDJSONRenderer
+from .routers import (
+    read_from_replica,
+    reading_from_replica,
+    record_write,
+    replica_chunks,
+    routing_scope,
+    wrote_recently,
+)
+from .serializers import (
+    BulkVoteSerializer,
+    RestaurantSerializer,
+    VoteSerializer,
+    VotingUserSerializer,
+)
+from .vote_queue import VoteQueueFull, vote_queue
+from .winners import get_winners
+
+
+MAX_WINNERS_RANGE = timedelta(days=366)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
 
-from voting.models import Restaurant, VotingUser
-from .serializers import RestaurantSerializer, VoteSerializer, VotingUserSerializer
+def stream_winners(date_from, date_to, size):
+    """Renders per-day winners as a JSON document, one day at a time."""
+    ranked = groupby(
+        DailyTally.objects.winners_between(date_from, date_to, size),
+        key=itemgetter(0),
+    )
+    next_date, next_winners = next(ranked, (None, ()))
+
+    yield '{"days": ['
+    day = date_from
+    while day <= date_to:
+        winners = []
+        if day == next_date:
+            winners = [winner for _, winner in next_winners]
+            next_date, next_winners = next(ranked, (None, ()))
+        yield ("" if day == date_from else ", ") + json.dumps(
+            {"date": day.isoformat(), "count": len(winners), "winners": winners}
+        )
+        day += timedelta(days=1)
+    yield "]}"
+
+
+class ReplicaReadsMixin:
+    """
+    Serves the replica_actions from the replica database, unless the client
+    wrote within the sticky window, which every successful write starts (see
+    voting.routers). Authentication and permission checks read the primary.
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def dispatch(self, request, *args, **kwargs):
+        with routing_scope():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.streaming and reading_from_replica():
+                response.streaming_content = replica_chunks(response.streaming_content)
+        if self.request.method not in SAFE_METHODS and status.is_success(
+            response.status_code
+        ):
+            record_write(self.request.user)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and not wrote_recently(request.user):
+            read_from_replica()
+
+
+class ValuesListMixin:
+    """
+    Lists .values() rows of the serializer's fields instead of serializing
+    model instances. Only for serializers whose fields are all plain model
+    fields, rendered as they are stored.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_serializer_class().Meta.fields
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
 
 
 @extend_schema_view()
-class VotingUserViewSet(viewsets.ModelViewSet):
+class VotingUserViewSet(ReplicaReadsMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = VotingUser.objects.order_by("-pk").all()
     serializer_class = VotingUserSerializer
 
 
 @extend_schema_view()
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(ReplicaReadsMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Restaurant.objects.order_by("-pk").all()
     serializer_class = RestaurantSerializer
+    replica_actions = ("list", "retrieve", "get_winners")
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response(request, super().retrieve, *args, **kwargs)
+
+    def catalog_response(self, request, view, *args, **kwargs):
+        # Restaurant writes bump the catalog version (see voting.signals).
+        version, updated_at = VersionStamp.objects.current(VersionStamp.CATALOG)
+        return conditional(
+            request,
+            lambda: view(request, *args, **kwargs),
+            etag=f"{VersionStamp.CATALOG}-{version}",
+            last_modified=updated_at,
+            private=True,
+            no_cache=True,
+        )
 
     @extend_schema(
-        description="Returns 3 restaurants with highest number of votes for a provided date",
+        description="Returns 3 restaurants with highest number of votes for a provided date. "
+        "When a from/to date range is provided instead, returns the winners of every day "
+        'in the range as {"days": [{"date": ..., "count": ..., "winners": [...]}, ...]}',
         parameters=[
             OpenApiParameter(
                 name="date",
@@ -42,7 +161,19 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                         "Retrieve winners for January 1, 2023", value="2023-01-31"
                     )
                 ],
-            )
+            ),
+            OpenApiParameter(
+                name="from",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="First day of a date range (inclusive); must be in ISO format",
+            ),
+            OpenApiParameter(
+                name="to",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Last day of a date range (inclusive); must be in ISO format",
+            ),
         ],
         examples=[
             OpenApiExample(
@@ -70,6 +201,9 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     )
     @action(methods=["get"], detail=False, url_path="winners")
     def get_winners(self, request):
+        if "from" in request.query_params or "to" in request.query_params:
+            return self.get_winners_between(request)
+
         try:
             date_param = date.fromisoformat(
                 request.query_params.get("date", date.today().isoformat())
@@ -79,23 +213,51 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                 detail="Date query parameter is required and must be in ISO format, i.e. yyyy-mm-dd",
                 code="422",
             )
-        winners = (
-            Restaurant.objects.filter(votes__date=date_param)
-            .annotate(
-                total_votes=Sum("votes__weight", filter=Q(votes__date=date_param)),
-                num_voters=Count(
-                    "votes__voting_user",
-                    distinct=True,
-                    filter=Q(votes__date=date_param),
-                ),
+
+        # Winners change with every vote of the day and with restaurant names.
+        # Days before today get no more votes, so clients may keep them.
+        last_vote_id = Vote.objects.last_id(date_param)
+        catalog_version, _ = VersionStamp.objects.current(VersionStamp.CATALOG)
+
+        def build():
+            # Never older than the ETag, even if this process's cache is.
+            winners_list = get_winners(
+                date_param, 3, state=(last_vote_id, catalog_version)
+            )
+            return Response(
+                {"count": len(winners_list), "winners": winners_list},
+                status=status.HTTP_200_OK,
             )
-            .order_by("-total_votes", "-num_voters")
-            .values()[:3]
+
+        cache_control = (
+            {"max_age": IMMUTABLE_MAX_AGE, "immutable": True}
+            if date_param < date.today()
+            else {"no_cache": True}
         )
-        winners_list = list(winners)
-        return Response(
-            {"count": len(winners_list), "winners": winners_list},
-            status=status.HTTP_200_OK,
+        return conditional(
+            request,
+            build,
+            etag=f"winners-{date_param}-{last_vote_id}-{catalog_version}",
+            private=True,
+            **cache_control,
+        )
+
+    def get_winners_between(self, request):
+        try:
+            date_from = date.fromisoformat(request.query_params["from"])
+            date_to = date.fromisoformat(request.query_params["to"])
+        except (KeyError, ValueError, TypeError):
+            raise APIException(
+                detail="From and to query parameters are both required and must be in ISO format, i.e. yyyy-mm-dd",
+                code="422",
+            )
+        if not timedelta(0) <= date_to - date_from < MAX_WINNERS_RANGE:
+            raise APIException(
+                detail=f"To must not be before from and the range must not be longer than {MAX_WINNERS_RANGE.days} days",
+                code="422",
+            )
+        return StreamingHttpResponse(
+            stream_winners(date_from, date_to, 3), content_type="application/json"
         )
 
     @extend_schema(
@@ -133,29 +295,178 @@ class RestaurantViewSet(viewsets.ModelViewSet):
                 code="422",
             )
 
-        if not VotingUser.objects.filter(id=user_id).exists():
+        try:
+            restaurant_id = int(pk)
+        except (ValueError, TypeError):
+            raise Http404
+
+        cast = vote_queue.submit if vote_queue.enabled else Vote.objects.cast
+        try:
+            ordinal, limit = cast(restaurant_id, user_id, date.today())
+        except VoteQueueFull:
+            return Response(
+                {"detail": "Too many votes are waiting to be saved, try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except VotingUser.DoesNotExist:
             raise APIException(
                 detail="User corresponding to user_id not found.",
                 code="422",
             )
-
-        restaurant = get_object_or_404(Restaurant, id=pk)
-        voting_user = VotingUser.objects.get(id=user_id)
-        voting_date = date.today()
-        total_votes = voting_user.total_votes(voting_user, voting_date)
-
-        if total_votes >= voting_user.limit:
+        except Restaurant.DoesNotExist:
+            raise Http404
+        except VoteLimitExceeded:
             return Response(
                 {"detail": "You have exceeded your voting limit for today."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
             )
 
-        restaurant.add_vote(total_votes, voting_user, voting_date)
         return Response(
             {
-                "restaurant_id": restaurant.pk,
-                "user_id": voting_user.pk,
-                "remaining_limit": voting_user.limit - total_votes - 1,
+                "restaurant_id": restaurant_id,
+                "user_id": user_id,
+                "remaining_limit": limit - ordinal,
             },
             status=status.HTTP_202_ACCEPTED,
         )
+
+    @extend_schema(
+        description="Vote for restaurants in bulk, e.g. with votes buffered by a kiosk. "
+        "Votes are applied in submission order; the response reports every item.",
+        request=BulkVoteSerializer(many=True),
+        examples=[
+            OpenApiExample(
+                "Request example",
+                value=[
+                    {"user_id": 120, "restaurant_id": 21},
+                    {"user_id": 121, "restaurant_id": 21},
+                ],
+                request_only=True,
+            ),
+            OpenApiExample(
+                "Response example",
+                value={
+                    "accepted": 1,
+                    "rejected": 1,
+                    "results": [
+                        {
+                            "user_id": 120,
+                            "restaurant_id": 21,
+                            "accepted": True,
+                            "weight": 0.5,
+                            "remaining_limit": 3,
+                        },
+                        {
+                            "user_id": 121,
+                            "restaurant_id": 21,
+                            "accepted": False,
+                            "detail": "You have exceeded your voting limit for today.",
+                        },
+                    ],
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    @action(methods=["post"], detail=False, url_path="votes/bulk", url_name="bulk-vote")
+    def bulk_vote(self, request):
+        serializer = BulkVoteSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=1000
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        items = [
+            (item["user_id"], item["restaurant_id"])
+            for item in serializer.validated_data
+        ]
+
+        results = Vote.objects.bulk_cast(items, date.today())
+        accepted = sum(result["accepted"] for result in results)
+        return Response(
+            {
+                "accepted": accepted,
+                "rejected": len(results) - accepted,
+                "results": [
+                    {"user_id": user_id, "restaurant_id": restaurant_id, **result}
+                    for (user_id, restaurant_id), result in zip(items, results)
+                ],
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+@extend_schema_view()
+class VoteViewSet(ReplicaReadsMixin, viewsets.GenericViewSet):
+    queryset = Vote.objects.all()
+    replica_actions = ("export",)
+
+    @extend_schema(
+        description="Streams raw votes as CSV or newline-delimited JSON. "
+        "The response is gzip-compressed when the client accepts it.",
+        parameters=[
+            OpenApiParameter(
+                name="from",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Only export votes cast on or after this date",
+            ),
+            OpenApiParameter(
+                name="to",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Only export votes cast on or before this date",
+            ),
+            OpenApiParameter(
+                name="format",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                enum=["csv", "ndjson"],
+                description="Export format, csv by default",
+            ),
+        ],
+        responses={
+            (200, "text/csv"): OpenApiTypes.STR,
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="export",
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        votes = self.get_queryset()
+        try:
+            if "from" in request.query_params:
+                votes = votes.filter(
+                    date__gte=date.fromisoformat(request.query_params["from"])
+                )
+            if "to" in request.query_params:
+                votes = votes.filter(
+                    date__lte=date.fromisoformat(request.query_params["to"])
+                )
+        except ValueError:
+            raise APIException(
+                detail="From and to query parameters must be in ISO format, i.e. yyyy-mm-dd",
+                code="422",
+            )
+
+        renderer = request.accepted_renderer
+        stream = {"csv": stream_csv, "ndjson": stream_ndjson}[renderer.format]
+        content = (chunk.encode() for chunk in stream(export_rows(votes)))
+        gzipped = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if gzipped:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(
+            content, content_type=f"{renderer.media_type}; charset=utf-8"
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="votes.{renderer.format}"'
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
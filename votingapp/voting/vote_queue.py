@@ -0,0 +1,259 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import OuterRef, Subquery
+
+from voting.counters import shared_counters
+from voting.models import (
+    DailyQuota,
+    Restaurant,
+    Vote,
+    VoteLimitExceeded,
+    VotingUser,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class VoteQueueFull(Exception):
+    pass
+
+
+class VoteQueue:
+    """
+    Accepts votes in memory and writes them in batches from a background thread.
+
+    Limits are checked against the user's daily quota as known to this process
+    (cached for a while, and taken from the shared counters when they know it)
+    plus the votes still waiting in the queue. The quota rows stay
+    authoritative: votes that other processes pushed over the limit in the
+    meantime are rejected and logged when the batch is written. Once the queue
+    stops, e.g. at process exit, new votes are refused as if it was full.
+    """
+
+    def __init__(
+        self,
+        enabled,
+        max_pending,
+        flush_interval_ms,
+        flush_size,
+        cache_seconds,
+        max_attempts,
+    ):
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_size = flush_size
+        self.cache_seconds = cache_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._votes = []
+        self._flushing = False
+        self._generation = 0
+        self._failures = 0
+        self._pending = Counter()
+        self._users = {}
+        self._restaurants = {}
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.VOTING_WRITE_BEHIND
+        return cls(
+            enabled=options["ENABLED"],
+            max_pending=options["MAX_PENDING"],
+            flush_interval_ms=options["FLUSH_INTERVAL_MS"],
+            flush_size=options["FLUSH_SIZE"],
+            cache_seconds=options["LIMIT_CACHE_SECONDS"],
+            max_attempts=options["MAX_ATTEMPTS"],
+        )
+
+    @property
+    def pending(self):
+        return len(self._votes)
+
+    def submit(self, restaurant_id, voting_user_id, voting_date):
+        """Queues a vote and returns its (ordinal, limit) like Vote.objects.cast."""
+        self.start()
+        limit, used = self._user_quota(voting_user_id, voting_date)
+        self._check_restaurant(restaurant_id)
+
+        key = (voting_user_id, voting_date)
+        with self._lock:
+            # Nothing writes votes queued after the last flush of stop().
+            if self._stopping or len(self._votes) >= self.max_pending:
+                raise VoteQueueFull
+            ordinal = used + self._pending[key] + 1
+            if ordinal > limit:
+                raise VoteLimitExceeded
+            self._votes.append((restaurant_id, voting_user_id, voting_date))
+            self._pending[key] += 1
+            if len(self._votes) >= self.flush_size:
+                self._wakeup.set()
+        return ordinal, limit
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="vote-queue-flusher", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Writes the remaining votes and stops the flusher thread."""
+        with self._lock:
+            self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def flush(self):
+        with self._lock:
+            votes, self._votes = self._votes, []
+            self._flushing = bool(votes)
+        if not votes:
+            return
+
+        by_date = defaultdict(list)
+        for restaurant_id, voting_user_id, voting_date in votes:
+            by_date[voting_date].append((voting_user_id, restaurant_id))
+        dropped = False
+        try:
+            # A batch spanning midnight is written all or nothing, so a retry
+            # never writes the votes of a date twice.
+            with transaction.atomic(using=router.db_for_write(Vote)):
+                results = {
+                    voting_date: Vote.objects.bulk_cast(items, voting_date)
+                    for voting_date, items in by_date.items()
+                }
+        except Exception:
+            self._failures += 1
+            if self._failures < self.max_attempts:
+                logger.exception("Writing %d queued votes failed, retrying", len(votes))
+                with self._lock:
+                    self._votes[:0] = votes
+                    self._flushing = False
+                    self._flushed.notify_all()
+                return
+            logger.exception(
+                "Writing %d queued votes failed %d times, dropping them",
+                len(votes),
+                self._failures,
+            )
+            dropped = True
+            results = {
+                voting_date: [
+                    {"accepted": False, "detail": "The vote could not be saved."}
+                ]
+                * len(items)
+                for voting_date, items in by_date.items()
+            }
+        self._failures = 0
+
+        with self._lock:
+            for voting_date, items in by_date.items():
+                for (voting_user_id, restaurant_id), result in zip(
+                    items, results[voting_date]
+                ):
+                    key = (voting_user_id, voting_date)
+                    self._pending[key] -= 1
+                    if not self._pending[key]:
+                        del self._pending[key]
+                    if result["accepted"]:
+                        if key in self._users:
+                            limit, used, expires = self._users[key]
+                            self._users[key] = (limit, used + 1, expires)
+                    else:
+                        # Dropped votes were acknowledged; log them to be replayed.
+                        logger.log(
+                            logging.ERROR if dropped else logging.WARNING,
+                            "Queued vote of user %s for restaurant %s on %s was "
+                            "rejected: %s",
+                            voting_user_id,
+                            restaurant_id,
+                            voting_date.isoformat(),
+                            result["detail"],
+                        )
+            self._flushing = False
+            self._generation += 1
+            self._flushed.notify_all()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+            self._forget_expired()
+        self.flush()
+        connections.close_all()
+
+    def _user_quota(self, voting_user_id, voting_date):
+        key = (voting_user_id, voting_date)
+        cached = self._users.get(key)
+        if cached is not None and cached[2] > time.monotonic():
+            return cached[:2]
+
+        while True:
+            with self._flushed:
+                self._flushed.wait_for(lambda: not self._flushing)
+                generation = self._generation
+            quota = shared_counters.quota(voting_user_id, voting_date)
+            if quota is not None:
+                used, limit = quota
+            else:
+                row = (
+                    VotingUser.objects.filter(pk=voting_user_id)
+                    .annotate(
+                        used=Subquery(
+                            DailyQuota.objects.filter(
+                                voting_user=OuterRef("pk"), date=voting_date
+                            ).values("used")
+                        )
+                    )
+                    .values_list("limit", "used")
+                    .first()
+                )
+                if row is None:
+                    raise VotingUser.DoesNotExist
+                limit, used = row[0], row[1] or 0
+            with self._lock:
+                # A batch written while querying may or may not be counted in
+                # `used` already while it is still counted as pending; read again.
+                if self._flushing or generation != self._generation:
+                    continue
+                self._users[key] = (limit, used, time.monotonic() + self.cache_seconds)
+            return limit, used
+
+    def _forget_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            for key, (_, _, expires) in list(self._users.items()):
+                if expires < now and key not in self._pending:
+                    del self._users[key]
+            for restaurant_id, expires in list(self._restaurants.items()):
+                if expires < now:
+                    del self._restaurants[restaurant_id]
+
+    def _check_restaurant(self, restaurant_id):
+        if self._restaurants.get(restaurant_id, 0) > time.monotonic():
+            return
+        if not Restaurant.objects.filter(pk=restaurant_id).exists():
+            raise Restaurant.DoesNotExist
+        self._restaurants[restaurant_id] = time.monotonic() + self.cache_seconds
+
+
+vote_queue = VoteQueue.from_settings()
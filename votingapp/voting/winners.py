@@ -0,0 +1,109 @@
+import time
+import uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from voting.counters import shared_counters
+from voting.metrics import winners_cache_requests
+from voting.models import Restaurant
+from voting.routers import routing_scope
+
+GLOBAL_VERSION_KEY = "voting:winners:version"
+LOCK_POLL_SECONDS = 0.02
+
+
+def winners_cache():
+    return caches[settings.VOTING_WINNERS_CACHE["ALIAS"]]
+
+
+def date_version_key(voting_date):
+    return f"voting:winners:version:{voting_date.isoformat()}"
+
+
+def invalidate_winners(dates=None):
+    """Drops cached winners of the given dates, or of every date."""
+    keys = (
+        [GLOBAL_VERSION_KEY]
+        if dates is None
+        else [date_version_key(voting_date) for voting_date in dates]
+    )
+    winners_cache().set_many(dict.fromkeys(keys, uuid.uuid4().hex), None)
+
+
+def query_winners(voting_date, size):
+    return list(
+        Restaurant.objects.filter(tallies__date=voting_date)
+        .annotate(
+            total_votes=F("tallies__total_votes"),
+            num_voters=F("tallies__num_voters"),
+        )
+        .order_by("-total_votes", "-num_voters")
+        .values()[:size]
+    )
+
+
+def get_winners(voting_date, size=3, state=None):
+    """
+    Returns the top `size` restaurants of a day from the cache or the tallies.
+
+    Entries are keyed by versions that are replaced whenever the day's tallies
+    change (see DailyTallyManager), so hits are never stale with a cache shared
+    by all processes. Past days are kept until evicted; today's and later days'
+    entries also expire after TODAY_TIMEOUT to bound staleness with per-process
+    caches. With STAMPEDE_LOCK_SECONDS, only one caller computes a missing
+    entry while the others wait for it. Missing entries are computed from the
+    primary even in views reading from the replica, since a lagging replica's
+    winners would be cached under the current versions.
+
+    `state` is what callers read to tell whether the winners changed, e.g. the
+    day's last vote id and the catalog version of an ETag. Entries are then
+    also keyed by it and computed from the tallies, so they are never older
+    than that state, even with per-process caches that missed an invalidation.
+    Without it, today's winners are ranked from the shared counters when they
+    are enabled and loaded.
+    """
+    options = settings.VOTING_WINNERS_CACHE
+    cache = winners_cache()
+    version_keys = [GLOBAL_VERSION_KEY, date_version_key(voting_date)]
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            # A missing version may have been evicted; never reuse old entries.
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+
+    key = "voting:winners:{}:{}:{}:{}".format(
+        voting_date.isoformat(), size, *(versions[key] for key in version_keys)
+    )
+    if state is not None:
+        key += ":" + ":".join(map(str, state))
+    winners = cache.get(key)
+    if winners is not None:
+        winners_cache_requests.inc(("hit",))
+        return winners
+    winners_cache_requests.inc(("miss",))
+
+    lock_seconds = options["STAMPEDE_LOCK_SECONDS"]
+    lock_key = f"{key}:lock"
+    locked = bool(lock_seconds) and cache.add(lock_key, True, lock_seconds)
+    if lock_seconds and not locked:
+        deadline = time.monotonic() + lock_seconds
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            winners = cache.get(key)
+            if winners is not None:
+                return winners
+
+    with routing_scope():
+        # The counters may not have merged every vote of the state yet.
+        winners = shared_counters.winners(voting_date, size) if state is None else None
+        if winners is None:
+            winners = query_winners(voting_date, size)
+    timeout = None if voting_date < date.today() else options["TODAY_TIMEOUT"]
+    cache.set(key, winners, timeout)
+    if locked:
+        cache.delete(lock_key)
+    return winners
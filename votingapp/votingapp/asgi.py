@@ -12,5 +12,28 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "votingapp.settings")
+# Requests return their database connection to the pool when they finish.
+os.environ.setdefault("VOTING_CONN_MAX_AGE", "0")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from voting.live import (
+    STREAM_PATH,
+    winners_stream,
+)  # noqa: E402  (needs the app registry)
+from voting.vote_queue import vote_queue  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # The winners stream holds its connection open, so it is served outside
+    # Django's request handling, which would tie up a thread per client.
+    if scope["type"] == "http" and scope["path"].rstrip("/") == STREAM_PATH:
+        await winners_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
+
+
+if vote_queue.enabled:
+    # Start flushing right away instead of on the first queued vote; pending
+    # votes are written when the server shuts the process down.
+    vote_queue.start()
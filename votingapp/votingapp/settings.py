@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,13 +40,22 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "django_filters",
-    "django_extensions",
     "voting",
-    "drf_spectacular",
-    "drf_spectacular_sidecar",
 ]
 
+# The API documentation (and the schema generation it imports) is only loaded
+# when served. Development tools (django_extensions' commands and the browsable
+# API) are only enabled when VOTINGAPP_DEV_TOOLS is on, which gunicorn.conf.py
+# turns off by default.
+SERVE_API_DOCS = os.environ.get("VOTINGAPP_DOCS", "1") == "1"
+if SERVE_API_DOCS:
+    INSTALLED_APPS += ["drf_spectacular", "drf_spectacular_sidecar"]
+DEV_TOOLS = os.environ.get("VOTINGAPP_DEV_TOOLS", "1" if DEBUG else "0") == "1"
+if DEV_TOOLS:
+    INSTALLED_APPS += ["django_extensions"]
+
 MIDDLEWARE = [
+    "voting.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,18 +89,104 @@ WSGI_APPLICATION = "votingapp.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Connections come from a per-process pool (voting.backends.postgresql) and are
+# kept by a thread for CONN_MAX_AGE seconds; asgi.py defaults CONN_MAX_AGE to 0,
+# because ASGI requests don't reuse a thread's connection, so that every request
+# returns its connection to the pool. VOTING_DB_POOL=0 turns the pool off.
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": (
+            "django.db.backends.postgresql"
+            if os.environ.get("VOTING_DB_POOL") == "0"
+            else "voting.backends.postgresql"
+        ),
         "NAME": os.environ.get("POSTGRES_NAME"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
-        "HOST": "db",
-        "PORT": 5432,
+        "HOST": os.environ.get("POSTGRES_HOST", "db"),
+        "PORT": int(os.environ.get("POSTGRES_PORT", 5432)),
+        "CONN_MAX_AGE": int(os.environ.get("VOTING_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("VOTING_DB_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.environ.get("VOTING_DB_POOL_MAX_SIZE", 10)),
+            # Seconds a connection may stay idle before it is closed.
+            "MAX_IDLE": int(os.environ.get("VOTING_DB_POOL_MAX_IDLE", 300)),
+            # Seconds to wait for a connection when all are in use.
+            "TIMEOUT": float(os.environ.get("VOTING_DB_POOL_TIMEOUT", 5)),
+            # Idle seconds after which a connection is pinged before reuse.
+            "CHECK_IDLE": 30,
+        },
+    }
+}
+
+# Local runs (tests, benchmarks) can use SQLite 3.35+ instead of PostgreSQL.
+if os.environ.get("VOTINGAPP_DATABASE") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("VOTINGAPP_SQLITE_NAME", BASE_DIR / "db.sqlite3"),
+        }
+    }
+
+# The list/retrieve actions, winners and exports can read from a replica (see
+# voting.routers). On SQLite the replica alias opens the same file, so routing
+# can be tried locally; there it is only used with VOTING_REPLICA_READS=1.
+if os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": int(os.environ.get("POSTGRES_REPLICA_PORT", 5432)),
     }
+elif DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["replica"] = dict(DATABASES["default"])
+if "replica" in DATABASES:
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["voting.routers.ReplicaRouter"]
+
+VOTING_REPLICA = {
+    "ENABLED": "replica" in DATABASES
+    and os.environ.get(
+        "VOTING_REPLICA_READS", "1" if os.environ.get("POSTGRES_REPLICA_HOST") else "0"
+    )
+    == "1",
+    # Seconds a client reads from the primary after a write.
+    "STICKY_SECONDS": int(os.environ.get("VOTING_REPLICA_STICKY_SECONDS", 5)),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The winners, permission and replica stickiness caches must be shared by all
+# app server processes, or invalidations and writes only reach one of them. The
+# local memory cache is private to every process, so gunicorn.conf.py, which
+# starts several workers, switches to a file cache in VOTINGAPP_CACHE_DIR that
+# the workers of a host share. Several hosts need a cache server instead.
+
+if os.environ.get("VOTINGAPP_CACHE", "locmem") == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "VOTINGAPP_CACHE_DIR",
+                os.path.join(
+                    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                    "votingapp-cache",
+                ),
+            ),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -133,13 +229,31 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.DjangoModelPermissions"],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_RENDERER_CLASSES": ["voting.renderers.FastJSONRenderer"]
+    + (["rest_framework.renderers.BrowsableAPIRenderer"] if DEV_TOOLS else []),
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+        "voting.authentication.ApiKeyAuthentication",
+    ],
+    "DEFAULT_PERMISSION_CLASSES": ["voting.permissions.CachedDjangoModelPermissions"],
+    "DEFAULT_PAGINATION_CLASS": "voting.pagination.SelectablePagination",
     "PAGE_SIZE": 10,
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Without the docs, views keep DRF's schema class instead of importing
+    # drf_spectacular's generator (see voting.openapi).
+    "DEFAULT_SCHEMA_CLASS": (
+        "drf_spectacular.openapi.AutoSchema"
+        if SERVE_API_DOCS
+        else "rest_framework.schemas.openapi.AutoSchema"
+    ),
 }
 
+# Rendered schemas, one file per code version and format (see voting.schema).
+API_SCHEMA_DIR = os.environ.get(
+    "VOTINGAPP_SCHEMA_DIR", os.path.join(tempfile.gettempdir(), "votingapp-schema")
+)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Voting API",
     "DESCRIPTION": "App to vote on restaurants",
@@ -149,3 +263,96 @@ SPECTACULAR_SETTINGS = {
     "SWAGGER_UI_FAVICON_HREF": "SIDECAR",
     "REDOC_DIST": "SIDECAR",
 }
+
+# Write-behind voting: votes are validated against cached daily quotas, queued in
+# memory and written in batches by a background thread of every app server process.
+# A batch that fails MAX_ATTEMPTS times in a row is dropped, logging every vote at
+# error level so it can be replayed.
+VOTING_WRITE_BEHIND = {
+    "ENABLED": os.environ.get("VOTING_WRITE_BEHIND") == "1",
+    "MAX_PENDING": 10000,
+    "FLUSH_INTERVAL_MS": 200,
+    "FLUSH_SIZE": 500,
+    "LIMIT_CACHE_SECONDS": 60,
+    "MAX_ATTEMPTS": 5,
+}
+
+# Shared-memory counters of today's votes (see voting/counters.py), used by all
+# app server processes of a host to reject over-limit votes and rank winners
+# without queries. RUN identifies a server run; gunicorn.conf.py sets it to the
+# master's pid, and a new run loads the counters from the database again.
+# Without it, e.g. in management commands, the counters are not used for reads,
+# only kept up to date for the server. A table that fills up turns the counters
+# off for the day.
+VOTING_SHARED_COUNTERS = {
+    "ENABLED": os.environ.get("VOTING_SHARED_COUNTERS") == "1",
+    "PATH": os.environ.get(
+        "VOTING_SHARED_COUNTERS_PATH",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "votingapp-counters",
+        ),
+    ),
+    "USER_SLOTS": 1 << 17,
+    "RESTAURANT_SLOTS": 1 << 14,
+    "LOAD_TIMEOUT": 30,
+    "RUN": (
+        int(os.environ["VOTING_SERVER_RUN"])
+        if os.environ.get("VOTING_SERVER_RUN")
+        else None
+    ),
+}
+
+# API keys are verified with a keyed hash and remembered by every process in a
+# bounded LRU for CACHE_SECONDS, which is also how long revocations take to apply
+# to other processes.
+VOTING_API_KEYS = {
+    "CACHE_SIZE": 10000,
+    "CACHE_SECONDS": 60,
+}
+
+# Resolved user permissions are cached in this cache alias. Changes made through
+# the ORM invalidate them immediately; TIMEOUT bounds how long a process with its
+# own cache can miss a change made by another process.
+VOTING_PERMISSION_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+# Per-view request metrics served on /metrics. SERVER_TIMING adds the database
+# and total time of a request as a Server-Timing header; queries slower than
+# SLOW_QUERY_MS are logged to the "voting.slow_queries" logger.
+VOTING_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": os.environ.get("VOTING_SERVER_TIMING") == "1",
+    "SLOW_QUERY_MS": int(os.environ.get("VOTING_SLOW_QUERY_MS", 200)),
+}
+
+# On PostgreSQL votes are range partitioned by date, one partition per "month" or
+# "day". Partitions for PRECREATE intervals ahead are created by the migration
+# and by `manage.py vote_partitions`, which should run daily.
+VOTING_PARTITIONS = {
+    "INTERVAL": os.environ.get("VOTING_PARTITION_INTERVAL", "month"),
+    "PRECREATE": 3,
+}
+
+# Winners of a day are cached in this cache alias. Votes and tally rebuilds
+# replace the cached entries; past days are kept until evicted. Use a cache
+# shared by all processes (e.g. file based, database or Redis) when running
+# several processes, otherwise a process may serve winners that are up to
+# TODAY_TIMEOUT seconds old. With STAMPEDE_LOCK_SECONDS, concurrent requests for
+# a missing entry wait up to that long for one of them to compute it.
+VOTING_WINNERS_CACHE = {
+    "ALIAS": "default",
+    "TODAY_TIMEOUT": 30,
+    "STAMPEDE_LOCK_SECONDS": 2,
+}
+
+# /restaurants/winners/stream (ASGI only): the winners are checked for changes
+# every INTERVAL seconds, a client more than BUFFER updates behind is
+# disconnected, and idle streams get a comment every KEEPALIVE seconds.
+VOTING_WINNERS_STREAM = {
+    "INTERVAL": float(os.environ.get("VOTING_WINNERS_STREAM_INTERVAL", 1)),
+    "BUFFER": 10,
+    "KEEPALIVE": 15,
+}
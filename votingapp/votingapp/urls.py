@@ -13,34 +13,43 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
 from rest_framework import routers
 
-from voting.viewsets import RestaurantViewSet, VotingUserViewSet
+from voting.views import healthz, metrics, readyz
+from voting.viewsets import RestaurantViewSet, VoteViewSet, VotingUserViewSet
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r"restaurants", RestaurantViewSet)
 router.register(r"users", VotingUserViewSet)
+router.register(r"votes", VoteViewSet)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
+    path("healthz", healthz, name="healthz"),
+    path("readyz", readyz, name="readyz"),
     path("", include(router.urls)),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/schema/swagger-ui/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
-    path(
-        "api/schema/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
-    ),
 ]
+
+if settings.SERVE_API_DOCS:
+    from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+    from voting.schema import CachedSchemaView
+
+    urlpatterns += [
+        path("api/schema/", CachedSchemaView.as_view(), name="schema"),
+        path(
+            "api/schema/swagger-ui/",
+            SpectacularSwaggerView.as_view(url_name="schema"),
+            name="swagger-ui",
+        ),
+        path(
+            "api/schema/redoc/",
+            SpectacularRedocView.as_view(url_name="schema"),
+            name="redoc",
+        ),
+    ]